@@ -1,11 +1,20 @@
-from flask import Flask, request, jsonify, send_file, session
+from flask import Flask, Blueprint, current_app, request, jsonify, send_file, session
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
 
+import collections
 import datetime
+import functools
+import heapq
 import io
+import json
+import math
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import matplotlib.pyplot as plt
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
@@ -15,22 +24,85 @@ import pandas as pd
 from backend.python_complexity import analyze_python_code
 from backend.java_complexity import calculate_java_complexity
 from backend.cpp_complexity import analyze_cpp_code
-from backend.export_pdf import generate_pdf
+from backend.export_pdf import generate_pdf, estimate_pdf_pages
 from backend.export_csv import generate_csv  
+from backend.rate_limit import TokenBucketLimiter, DatabaseTokenBucketLimiter, retry_after_header
+from backend.export_cache import ExportCache, content_etag
+from backend.database import db, configure_database
+from backend.estimate import estimate_complexity
+from backend.parallel_analysis import ParallelAnalyzer
+from backend.heatmap import build_blocks, window_lines, overview, BLOCK_LINES
+from backend.write_behind import WriteBehindQueue, IdAllocator
 
 
 # ------------------ App Setup ------------------ #
-app = Flask(__name__)
-app.secret_key = 'your_secret_key'
-CORS(app, supports_credentials=True)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///complexity.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+api = Blueprint('api', __name__)
+login_manager = LoginManager()
 
 
-# ------------------ Flask-Login Setup ------------------ #
-login_manager = LoginManager()
-login_manager.init_app(app)
+def create_app(config=None):
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key')
+    CORS(app, supports_credentials=True)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Default token buckets per user: capacity and refill per second, in input
+    # lines for /analyze and in rendered pages for /download/pdf. Individual users
+    # can be given their own limits through the RateLimit table.
+    app.config['RATE_LIMITS'] = {
+        'analyze': {'capacity': 20000, 'refill_rate': 200},
+        'pdf': {'capacity': 100, 'refill_rate': 1},
+    }
+    # 'memory' keeps buckets in this process; 'database' shares them between
+    # worker processes through the rate_bucket table.
+    app.config['RATE_LIMIT_STORAGE'] = 'memory'
+    app.config['EXPORT_CACHE_DIR'] = os.path.join(app.instance_path, 'export_cache')
+    # Submissions of at least ESTIMATE_MIN_LINES lines get ANALYSIS_LATENCY_BUDGET
+    # seconds for the exact analysis; past that /analyze answers with a fast
+    # estimate and the exact result is stored when the background run ends.
+    app.config['ESTIMATE_MIN_LINES'] = 10000
+    app.config['ANALYSIS_LATENCY_BUDGET'] = 1.0
+    app.config['ANALYSIS_WORKERS'] = 2
+    # An exact run still unfinished after ANALYSIS_JOB_TIMEOUT seconds is
+    # taken to have died with its worker process and is marked failed.
+    app.config['ANALYSIS_JOB_TIMEOUT'] = 3600
+    # Files of at least PARALLEL_MIN_LINES lines are split across
+    # PARALLEL_WORKERS processes (none below 2); results are the same as serial.
+    app.config['PARALLEL_MIN_LINES'] = 5000
+    app.config['PARALLEL_WORKERS'] = os.cpu_count() or 1
+    # /analyze queues its rows and answers; a background thread commits them
+    # in batches of up to WRITE_BATCH_SIZE, at most WRITE_FLUSH_INTERVAL
+    # seconds later, and reads in this process merge in the queued rows.
+    # WRITE_SYNC_COMMIT makes /analyze wait for its batch (still committed
+    # together with concurrent submissions), for deployments whose other
+    # processes can't see this queue. WRITE_BEHIND = False commits each
+    # submission on its own before responding.
+    app.config['WRITE_BEHIND'] = True
+    app.config['WRITE_SYNC_COMMIT'] = False
+    app.config['WRITE_FLUSH_INTERVAL'] = 0.05
+    app.config['WRITE_BATCH_SIZE'] = 200
+    app.config.from_envvar('COMPLEXITY_SETTINGS', silent=True)
+    if config:
+        app.config.update(config)
+
+    configure_database(app)
+    login_manager.init_app(app)
+    app.register_blueprint(api)
+
+    if app.config['RATE_LIMIT_STORAGE'] == 'database':
+        app.extensions['rate_limiter'] = DatabaseTokenBucketLimiter(db)
+    else:
+        app.extensions['rate_limiter'] = TokenBucketLimiter()
+    app.extensions['export_cache'] = ExportCache(app.config['EXPORT_CACHE_DIR'])
+    app.extensions['analysis_executor'] = ThreadPoolExecutor(max_workers=app.config['ANALYSIS_WORKERS'])
+    app.extensions['parallel_analyzer'] = ParallelAnalyzer(app.config['PARALLEL_WORKERS'],
+                                                           app.config['PARALLEL_MIN_LINES'])
+    app.extensions['result_ids'] = IdAllocator(db, 'complexity_result')
+    app.extensions['result_writer'] = None
+    if app.config['WRITE_BEHIND']:
+        app.extensions['result_writer'] = WriteBehindQueue(app, write_results, write_failed,
+                                                           flush_interval=app.config['WRITE_FLUSH_INTERVAL'],
+                                                           max_batch=app.config['WRITE_BATCH_SIZE'])
+    return app
 
 
 # ------------------ Models ------------------ #
@@ -51,6 +123,323 @@ class ComplexityResult(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
 
+class Hotspot(db.Model):
+    # One row per scored method, class or line of a ComplexityResult, so the
+    # top-K query is an index-ordered scan instead of re-running the analyzers.
+    id = db.Column(db.Integer, primary_key=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('complexity_result.id'), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    filename = db.Column(db.String(100))
+    language = db.Column(db.String(50))
+    kind = db.Column(db.String(10))
+    name = db.Column(db.String(200))
+    line = db.Column(db.Integer)
+    dc = db.Column(db.Float)
+    cc = db.Column(db.Float)
+    timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_hotspot_user_dc', 'user_id', 'dc'),
+        db.Index('ix_hotspot_user_kind_dc', 'user_id', 'kind', 'dc'),
+        db.Index('ix_hotspot_user_language_dc', 'user_id', 'language', 'dc'),
+        db.Index('ix_hotspot_user_timestamp_dc', 'user_id', 'timestamp', 'dc'),
+    )
+
+
+HOTSPOT_KINDS = ('method', 'class', 'line')
+MAX_HOTSPOT_LIMIT = 500
+# Date-bounded queries scan the date range when it holds fewer rows than
+# this, and otherwise walk the dc index, which then finds `limit` rows in
+# the range after about limit * total / HOTSPOT_RANGE_ROWS rows at most.
+HOTSPOT_RANGE_ROWS = 20000
+
+
+def hotspot_rows(result, method_breakdown, class_breakdown, line_dc_map):
+    code_lines = result['code'].split('\n')
+    common = {
+        'result_id': result['id'],
+        'user_id': result['user_id'],
+        'filename': result['filename'],
+        'language': result['language'],
+        'timestamp': result['timestamp'],
+    }
+    rows = []
+    for kind, breakdown in (('method', method_breakdown), ('class', class_breakdown)):
+        for name, scores in breakdown.items():
+            rows.append(dict(common, kind=kind, name=name[:200], line=None,
+                             dc=scores.get('dc', 0), cc=scores.get('cc', 0)))
+    for line_no, score in line_dc_map.items():
+        if not score:
+            continue
+        line_no = int(line_no)
+        text = code_lines[line_no - 1].strip() if 0 < line_no <= len(code_lines) else ''
+        rows.append(dict(common, kind='line', name=text[:200], line=line_no,
+                         dc=score, cc=None))
+    return rows
+
+
+class ResultMetrics(db.Model):
+    # File-level cognitive/Halstead/LOC metrics of a ComplexityResult, plus
+    # the per-method and per-class breakdowns as JSON.
+    result_id = db.Column(db.Integer, db.ForeignKey('complexity_result.id'), primary_key=True)
+    cognitive = db.Column(db.Integer)
+    halstead_volume = db.Column(db.Float)
+    halstead_effort = db.Column(db.Float)
+    ploc = db.Column(db.Integer)
+    lloc = db.Column(db.Integer)
+    methods = db.Column(db.Text)
+    classes = db.Column(db.Text)
+
+    def to_dict(self):
+        return {
+            'cognitive': self.cognitive,
+            'halstead_volume': self.halstead_volume,
+            'halstead_effort': self.halstead_effort,
+            'ploc': self.ploc,
+            'lloc': self.lloc
+        }
+
+
+def metrics_row(result_id, metrics, method_breakdown, class_breakdown):
+    return {
+        'result_id': result_id,
+        'cognitive': metrics.get('cognitive'),
+        'halstead_volume': metrics.get('halstead_volume'),
+        'halstead_effort': metrics.get('halstead_effort'),
+        'ploc': metrics.get('ploc'),
+        'lloc': metrics.get('lloc'),
+        'methods': json.dumps(method_breakdown),
+        'classes': json.dumps(class_breakdown)
+    }
+
+
+class ResultDetail(db.Model):
+    result_id = db.Column(db.Integer, db.ForeignKey('complexity_result.id'), primary_key=True)
+    line_scores = db.Column(db.Text)
+    structures = db.Column(db.Text)
+
+
+class ResultBlock(db.Model):
+    # A result's code and line scores in BLOCK_LINES-line slices, so a heatmap
+    # window loads only the blocks it overlaps. The small columns come first:
+    # the minimap query reads them without touching the code's overflow pages.
+    result_id = db.Column(db.Integer, db.ForeignKey('complexity_result.id'), primary_key=True)
+    block = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    start_line = db.Column(db.Integer)
+    end_line = db.Column(db.Integer)
+    max_dc = db.Column(db.Float)
+    total_dc = db.Column(db.Float)
+    line_scores = db.Column(db.Text)
+    code = db.Column(db.Text)
+
+
+def block_rows(result_id, code, line_dc_map):
+    blocks = build_blocks(code, line_dc_map)
+    for block in blocks:
+        block['result_id'] = result_id
+        block['line_scores'] = json.dumps(block['line_scores'])
+    return blocks
+
+
+class AnalysisJob(db.Model):
+    # Present only for results that were answered with an estimate; results
+    # without a job row were analyzed exactly before responding.
+    result_id = db.Column(db.Integer, db.ForeignKey('complexity_result.id'), primary_key=True)
+    status = db.Column(db.String(20), default='estimated')
+    error = db.Column(db.Text)
+    started = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    finished = db.Column(db.DateTime)
+
+
+def analysis_rows(result, analysis):
+    # The rows an analysis adds for a result (a dict of its columns), as
+    # (model, rows) pairs for insert_rows.
+    return [
+        (Hotspot, hotspot_rows(result, analysis['methods'], analysis['classes'], analysis['line_dc_map'])),
+        (ResultMetrics, [metrics_row(result['id'], analysis['metrics'], analysis['methods'], analysis['classes'])]),
+        (ResultDetail, [{
+            'result_id': result['id'],
+            'line_scores': json.dumps(analysis['line_dc_map']),
+            'structures': json.dumps(analysis['structures'])
+        }]),
+        (ResultBlock, block_rows(result['id'], result['code'], analysis['line_dc_map'])),
+    ]
+
+
+def insert_rows(pairs):
+    # One executemany per table, in the order tables first appear (parents
+    # before children).
+    grouped = {}
+    for model, rows in pairs:
+        grouped.setdefault(model, []).extend(rows)
+    for model, rows in grouped.items():
+        if rows:
+            db.session.bulk_insert_mappings(model, rows)
+
+
+def persist_analysis(result_entry, analysis):
+    result = {column: getattr(result_entry, column)
+              for column in ('id', 'user_id', 'filename', 'language', 'timestamp', 'code')}
+    insert_rows(analysis_rows(result, analysis))
+
+
+class RateLimit(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    bucket = db.Column(db.String(20))
+    capacity = db.Column(db.Float)
+    refill_rate = db.Column(db.Float)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'bucket'),)
+
+
+class RateBucket(db.Model):
+    bucket_key = db.Column(db.String(100), primary_key=True)
+    tokens = db.Column(db.Float)
+    updated = db.Column(db.Float)
+
+
+class IdBlock(db.Model):
+    # Next unreserved primary key per table, for rows that get their id
+    # before the write-behind queue inserts them.
+    name = db.Column(db.String(50), primary_key=True)
+    next_id = db.Column(db.Integer, nullable=False)
+
+
+class HistoryVersion(db.Model):
+    # Bumped on every insert/delete of a user's results; /history uses it as
+    # its ETag so a revalidation never has to load the stored code.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+
+def bump_history_version(user_id, count=1):
+    updated = HistoryVersion.query.filter_by(user_id=user_id).update(
+        {HistoryVersion.version: HistoryVersion.version + count})
+    if not updated:
+        db.session.add(HistoryVersion(user_id=user_id, version=count))
+
+
+def history_etag(user_id):
+    entry = HistoryVersion.query.get(user_id)
+    return f'h{user_id}-{entry.version if entry else 0}'
+
+
+# ------------------ Write-Behind ------------------ #
+def result_rows(result, analysis, estimated=False):
+    # Everything one submission inserts, built by the request thread so the
+    # writer only executes SQL. For an estimate only its heatmap blocks are
+    # stored; finish_analysis replaces them with the exact run's rows.
+    pairs = [(ComplexityResult, [result])]
+    if estimated:
+        pairs.append((AnalysisJob, [{'result_id': result['id'], 'status': 'estimated',
+                                     'started': datetime.datetime.utcnow()}]))
+        pairs.append((ResultBlock, block_rows(result['id'], result['code'], analysis['line_dc_map'])))
+    else:
+        pairs += analysis_rows(result, analysis)
+    return pairs
+
+
+def write_results(items):
+    # items are (user_id, result_rows) pairs: a whole write-behind batch, or
+    # a single submission when write-behind is off.
+    insert_rows(pair for _, pairs in items for pair in pairs)
+    for user_id, count in collections.Counter(user_id for user_id, _ in items).items():
+        bump_history_version(user_id, count)
+
+
+def write_failed(item, error):
+    # A queued submission that could not be stored keeps its reserved id as
+    # a failed result, so the id the client was given doesn't just vanish.
+    user_id, pairs = item
+    result = pairs[0][1][0]
+    db.session.add(ComplexityResult(**result))
+    db.session.add(AnalysisJob(result_id=result['id'], status='failed', error=str(error),
+                               finished=datetime.datetime.utcnow()))
+    bump_history_version(user_id)
+
+
+def pending_writes():
+    # The current user's (seq, item) still in this process's write-behind
+    # queue. Taken before reading the database, so a result committed in
+    # between is found in one or both, never in neither.
+    writer = current_app.extensions['result_writer']
+    return writer.pending(current_user.id) if writer else []
+
+
+def queued_result(result_id):
+    # {model: rows} for one of the user's results while it is still queued.
+    for _, (_, pairs) in pending_writes():
+        if pairs[0][1][0]['id'] == result_id:
+            return dict(pairs)
+    return None
+
+
+def as_stored(model, row):
+    # A queued row as the database will return it (Float columns as
+    # floats), so answers don't change once it is committed.
+    columns = model.__table__.c
+    return {key: float(value) if value is not None and isinstance(columns[key].type, db.Float) else value
+            for key, value in row.items()}
+
+
+def stored_row(model, result_id, queued):
+    # One row of `model` for a result: from its queued rows while it has
+    # any, as an unsaved instance, otherwise from the database.
+    if queued is None:
+        return db.session.get(model, result_id)
+    rows = queued.get(model)
+    return model(**as_stored(model, rows[0])) if rows else None
+
+
+def settle_writes():
+    # Wait for the user's queued results, before changing them.
+    writer = current_app.extensions['result_writer']
+    if writer:
+        writer.settle(current_user.id)
+
+
+# ------------------ Conditional GET ------------------ #
+def not_modified(etag):
+    if not request.if_none_match.contains(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def result_etag(prefix, entry):
+    # Finished results never change; the timestamp guards against a reused id.
+    return f"{prefix}{entry.id}-{entry.timestamp:%Y%m%d%H%M%S%f}"
+
+
+# ------------------ Rate Limiting ------------------ #
+def check_rate_limit(bucket, cost):
+    limits = dict(current_app.config['RATE_LIMITS'][bucket])
+    override = RateLimit.query.filter_by(user_id=current_user.id, bucket=bucket).first()
+    if override:
+        limits['capacity'] = override.capacity
+        limits['refill_rate'] = override.refill_rate
+
+    wait = current_app.extensions['rate_limiter'].consume((current_user.id, bucket), cost, limits['capacity'], limits['refill_rate'])
+    if not wait:
+        return None
+    # A bucket that never refills gets no Retry-After: waiting won't help.
+    never = math.isinf(wait)
+    response = jsonify({'error': 'Rate limit exceeded', 'retry_after': None if never else wait})
+    response.status_code = 429
+    if not never:
+        response.headers['Retry-After'] = retry_after_header(wait)
+    return response
+
+
 # ------------------ User Loader ------------------ #
 @login_manager.user_loader
 def load_user(user_id):
@@ -58,7 +447,7 @@ def load_user(user_id):
 
 
 # ------------------ Signup ------------------ #
-@app.route('/signup', methods=['POST'])
+@api.route('/signup', methods=['POST'])
 def signup():
     email = request.form.get('email')
     password = request.form.get('password')
@@ -72,7 +461,7 @@ def signup():
 
 
 # ------------------ Login ------------------ #
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login():
     email = request.form.get('email')
     password = request.form.get('password')
@@ -84,7 +473,7 @@ def login():
 
 
 # ------------------ Logout ------------------ #
-@app.route('/logout', methods=['POST'])
+@api.route('/logout', methods=['POST'])
 @login_required
 def logout():
     logout_user()
@@ -92,7 +481,96 @@ def logout():
 
 
 # ------------------ Analyze Code ------------------ #
-@app.route('/analyze', methods=['POST'])
+ANALYZED_LANGUAGES = ('python', 'java', 'c++')
+
+
+def run_analysis(language, code, parallel=None):
+    # `parallel` (a ParallelAnalyzer) splits very large files across processes.
+    if language == 'python':
+        result = parallel.analyze(language, code) if parallel else analyze_python_code(code)
+        dc = result['total_dc']
+        cc = result['total_cc']
+    elif language == 'java':
+        result = parallel.analyze(language, code) if parallel else calculate_java_complexity(code)
+        dc = result.get('decisional_complexity', 0)
+        cc = result.get('cyclomatic_complexity', 0)
+    elif language == 'c++':
+        result = parallel.analyze(language, code) if parallel else analyze_cpp_code(code)
+        dc = result.get('decisional_complexity', 0)
+        cc = result.get('cyclomatic_complexity', 0)
+    else:
+        raise ValueError('Unsupported language')
+
+    return {
+        'dc': dc,
+        'cc': cc,
+        'line_dc_map': result.get('line_scores', {}),
+        'methods': result.get('methods', {}),
+        'classes': result.get('classes', {}),
+        'structures': result.get('structures', {}),
+        'metrics': result.get('metrics', {})
+    }
+
+
+def finish_analysis(app, result_id, write_seq, future):
+    if write_seq:
+        # The result row may still be waiting in the write-behind queue.
+        app.extensions['result_writer'].wait(write_seq)
+    with app.app_context():
+        entry = db.session.get(ComplexityResult, result_id)
+        job = db.session.get(AnalysisJob, result_id)
+        if not entry or not job:
+            # Deleted while the exact analysis was still running.
+            return
+        try:
+            analysis = future.result()
+            entry.dc = analysis['dc']
+            entry.cc = analysis['cc']
+            # Drop the estimate's heatmap blocks; persist_analysis stores exact ones.
+            ResultBlock.query.filter_by(result_id=result_id).delete()
+            persist_analysis(entry, analysis)
+            job.status = 'done'
+            bump_history_version(entry.user_id)
+            job.finished = datetime.datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            # Whether the analyzer or storing its output failed, the job must
+            # leave 'estimated' or clients would poll it forever.
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished = datetime.datetime.utcnow()
+            db.session.commit()
+
+
+def fail_stale_jobs(started_before=None):
+    # The exact run of an estimated result only lives in the thread pool of
+    # the process that answered /analyze. After a restart, a crash or a
+    # SIGKILL past gunicorn's graceful timeout nothing will finish it, so the
+    # job is failed instead of being polled forever. The status condition
+    # leaves jobs a live run finished in the meantime alone.
+    query = AnalysisJob.query.filter_by(status='estimated')
+    if started_before:
+        query = query.filter(AnalysisJob.started < started_before)
+    failed = query.update({
+        AnalysisJob.status: 'failed',
+        AnalysisJob.error: 'The server stopped before the exact analysis finished; submit the file again',
+        AnalysisJob.finished: datetime.datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    return failed
+
+
+def expire_stale_job(job):
+    # gunicorn replaces a dead worker without running start() again, so its
+    # jobs can only be told apart from running ones by their age.
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=current_app.config['ANALYSIS_JOB_TIMEOUT'])
+    if job and job.status == 'estimated' and job.started and job.started < cutoff:
+        if fail_stale_jobs(cutoff):
+            db.session.refresh(job)
+
+
+@api.route('/analyze', methods=['POST'])
 @login_required
 def analyze():
     data = request.get_json()
@@ -102,82 +580,245 @@ def analyze():
 
     if not code:
         return jsonify({'error': 'No code submitted'}), 400
+    if language not in ANALYZED_LANGUAGES:
+        return jsonify({'error': 'Unsupported language'}), 400
 
-    try:
-        line_dc_map = {}
-        method_breakdown = {}
-        class_breakdown = {}
-        structure_summary = {}
-
-        if language == 'python':
-            result = analyze_python_code(code)
-            dc = result['total_dc']
-            cc = result['total_cc']
-            line_dc_map = result['line_scores']
-            method_breakdown = result['methods']
-            class_breakdown = result['classes']
-            structure_summary = result.get('structures', {})
-
-        elif language == 'java':
-            result = calculate_java_complexity(code)
-            dc = result.get('decisional_complexity', 0)
-            cc = result.get('cyclomatic_complexity', 0)
-            line_dc_map = result.get('line_scores', {})
-            method_breakdown = result.get('methods', {})
-            class_breakdown = result.get('classes', {})
-            structure_summary = result.get('structures', {})  
-
-        elif language == 'c++':
-            result = analyze_cpp_code(code)
-            dc = result.get('decisional_complexity', 0)
-            cc = result.get('cyclomatic_complexity', 0)
-            line_dc_map = result.get('line_scores', {})
-            method_breakdown = result.get('methods', {})
-            class_breakdown = result.get('classes', {})
-            structure_summary = result.get('structures', {})
-              
+    line_count = code.count('\n') + 1
+    limited = check_rate_limit('analyze', line_count)
+    if limited:
+        return limited
 
+    try:
+        future = None
+        parallel = current_app.extensions['parallel_analyzer']
+        if line_count >= current_app.config['ESTIMATE_MIN_LINES']:
+            future = current_app.extensions['analysis_executor'].submit(run_analysis, language, code, parallel)
+            try:
+                analysis = future.result(timeout=current_app.config['ANALYSIS_LATENCY_BUDGET'])
+                future = None
+            except FutureTimeoutError:
+                analysis = estimate_complexity(code, language)
+                analysis.update(line_dc_map=analysis.pop('line_scores'),
+                                methods={}, classes={}, structures={}, metrics={})
         else:
-            return jsonify({'error': 'Unsupported language'}), 400
-
-        # Save to DB
-        result_entry = ComplexityResult(
-            user_id=current_user.id,
-            filename=filename,
-            language=language,
-            dc=dc,
-            cc=cc,
-            code=code
-        )
-        db.session.add(result_entry)
-        db.session.commit()
+            analysis = run_analysis(language, code, parallel)
+        dc = analysis['dc']
+        cc = analysis['cc']
 
-        # Save to session
-        session['latest_result'] = {
+        # Save to DB. With write-behind the rows are queued under an id
+        # reserved up front and committed with the next batch.
+        result = {
+            'user_id': current_user.id,
             'filename': filename,
             'language': language,
             'dc': dc,
             'cc': cc,
             'code': code,
-            'line_dc_map': line_dc_map
+            'timestamp': datetime.datetime.utcnow()
         }
+        result['id'] = result_id = current_app.extensions['result_ids'].next_id()
+        item = (current_user.id, result_rows(result, analysis, estimated=bool(future)))
+        writer = current_app.extensions['result_writer']
+        write_seq = None
+        if writer:
+            sync = current_app.config['WRITE_SYNC_COMMIT']
+            write_seq = writer.submit(current_user.id, item, track=sync)
+            if sync and not writer.wait(write_seq):
+                # Stored as a failed result under result_id instead.
+                return jsonify({'error': 'Could not store the result', 'result_id': result_id}), 500
+        else:
+            write_results([item])
+            db.session.commit()
 
-        return jsonify({
+        # Save to session. Only the id goes into the cookie: the code itself
+        # can be far larger than the request header limits of a real server.
+        # Estimated results get no ETag since their report will still change.
+        session['latest_result'] = {'id': result_id}
+        if not future:
+            session['latest_result']['etag'] = content_etag({
+                'filename': filename,
+                'language': language,
+                'dc': dc,
+                'cc': cc,
+                'code': code
+            })
+
+        response = {
+            'result_id': result_id,
+            'status': 'done',
             'dc': dc,
             'cc': cc,
-            'line_dc_map': line_dc_map,
-            'methods': method_breakdown,
-            'classes': class_breakdown,
-            'structures': structure_summary
-        })
+            'line_dc_map': analysis['line_dc_map'],
+            'methods': analysis['methods'],
+            'classes': analysis['classes'],
+            'structures': analysis['structures'],
+            'metrics': analysis['metrics']
+        }
+        if future:
+            # Registered after the row is committed or queued; the callback
+            # waits for a queued row before updating it.
+            future.add_done_callback(functools.partial(
+                finish_analysis, current_app._get_current_object(), result_id, write_seq))
+            response['status'] = 'estimated'
+            response['poll_url'] = f'/results/{result_id}'
+            return jsonify(response), 202
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# ------------------ Analysis Result ------------------ #
+@api.route('/results/<int:result_id>', methods=['GET'])
+@login_required
+def get_result(result_id):
+    queued = queued_result(result_id)
+    if queued:
+        entry = stored_row(ComplexityResult, result_id, queued)
+    else:
+        entry = ComplexityResult.query.filter_by(id=result_id, user_id=current_user.id).first()
+    if not entry:
+        return jsonify({'error': 'Entry not found'}), 404
+    job = stored_row(AnalysisJob, result_id, queued)
+    if not queued:
+        expire_stale_job(job)
+    status = job.status if job else 'done'
+    response = {'result_id': entry.id, 'status': status, 'dc': entry.dc, 'cc': entry.cc}
+    if job and job.error:
+        response['error'] = job.error
+    if status == 'done':
+        etag = result_etag('r', entry)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        detail = stored_row(ResultDetail, result_id, queued)
+        metrics = stored_row(ResultMetrics, result_id, queued)
+        response.update(
+            line_dc_map=json.loads(detail.line_scores) if detail else {},
+            structures=json.loads(detail.structures) if detail else {},
+            methods=json.loads(metrics.methods) if metrics else {},
+            classes=json.loads(metrics.classes) if metrics else {},
+            metrics=metrics.to_dict() if metrics else {}
+        )
+        return with_etag(jsonify(response), etag)
+    return jsonify(response)
+
+
+
+# ------------------ Heatmap Window ------------------ #
+MAX_HEATMAP_LINES = 2000
+MAX_OVERVIEW_BLOCKS = 1000
+OVERVIEW_COLUMNS = (ResultBlock.block, ResultBlock.start_line, ResultBlock.end_line,
+                    ResultBlock.max_dc, ResultBlock.total_dc)
+
+
+def load_block_overview(result_id):
+    rows = (
+        db.session.query(*OVERVIEW_COLUMNS)
+        .filter(ResultBlock.result_id == result_id)
+        .order_by(ResultBlock.block)
+        .all()
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def backfill_blocks(entry, status):
+    # Results stored before blocks existed: split the stored line scores
+    # once (results older than ResultDetail are analyzed once more, and
+    # unfinished ones estimated).
+    code = db.session.query(ComplexityResult.code).filter_by(id=entry.id).scalar()
+    detail = db.session.get(ResultDetail, entry.id)
+    if status != 'done':
+        line_scores = estimate_complexity(code, entry.language)['line_scores']
+    elif detail:
+        line_scores = {int(k): v for k, v in json.loads(detail.line_scores).items()}
+    else:
+        line_scores = run_analysis(entry.language, code)['line_dc_map']
+    insert_rows([(ResultBlock, block_rows(entry.id, code, line_scores))])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request backfilled the same result first.
+        db.session.rollback()
+
+
+@api.route('/results/<int:result_id>/heatmap', methods=['GET'])
+@login_required
+def get_heatmap(result_id):
+    try:
+        start = max(int(request.args.get('start', 1)), 1)
+        end = int(request.args.get('end', start + 199))
+        count = min(max(int(request.args.get('blocks', 100)), 1), MAX_OVERVIEW_BLOCKS)
+    except ValueError:
+        return jsonify({'error': 'start, end and blocks must be integers'}), 400
+    if end < start:
+        return jsonify({'error': 'end must not be before start'}), 400
+    end = min(end, start + MAX_HEATMAP_LINES - 1)
+
+    # The code column can be megabytes; only the requested blocks are read.
+    queued = queued_result(result_id)
+    if queued:
+        entry = stored_row(ComplexityResult, result_id, queued)
+    else:
+        entry = (
+            ComplexityResult.query.options(db.defer(ComplexityResult.code))
+            .filter_by(id=result_id, user_id=current_user.id)
+            .first()
+        )
+    if not entry:
+        return jsonify({'error': 'Entry not found'}), 404
+    job = stored_row(AnalysisJob, result_id, queued)
+    status = job.status if job else 'done'
+
+    # Until the exact run lands the stored blocks hold the estimate, so only
+    # finished results are cached.
+    etag = None
+    if status == 'done':
+        etag = f"{result_etag('hm', entry)}-{start}-{end}-{count}"
+        cached = not_modified(etag)
+        if cached:
+            return cached
+    first, last = (start - 1) // BLOCK_LINES, (end - 1) // BLOCK_LINES
+    if queued:
+        summary = [as_stored(ResultBlock, row) for row in queued.get(ResultBlock, [])]
+        rows = [row for row in summary if first <= row['block'] <= last]
+    else:
+        summary = load_block_overview(result_id)
+        if not summary:
+            backfill_blocks(entry, status)
+            summary = load_block_overview(result_id)
+        rows = [
+            {'start_line': row.start_line, 'code': row.code, 'line_scores': row.line_scores}
+            for row in (
+                ResultBlock.query
+                .filter(ResultBlock.result_id == result_id, ResultBlock.block.between(first, last))
+                .order_by(ResultBlock.block)
+            )
+        ]
+    blocks = [
+        {
+            'start_line': row['start_line'],
+            'code': row['code'],
+            'line_scores': {int(k): v for k, v in json.loads(row['line_scores']).items()}
+        }
+        for row in rows
+    ]
+
+    line_count = summary[-1]['end_line'] if summary else 0
+    response = jsonify({
+        'result_id': result_id,
+        'status': status,
+        'line_count': line_count,
+        'start': start,
+        'end': min(end, line_count),
+        'lines': window_lines(blocks, start, end),
+        'overview': overview(summary, count)
+    })
+    return with_etag(response, etag) if etag else response
+
 
 # ------------------ Reset Password ------------------ #
-@app.route('/reset-password', methods=['POST'])
+@api.route('/reset-password', methods=['POST'])
 def reset_password():
     email = request.form.get('email')
     new_password = request.form.get('new_password')
@@ -190,10 +831,35 @@ def reset_password():
 
 
 # ------------------ Get Submission History ------------------ #
-@app.route('/history', methods=['GET'])
+@api.route('/history', methods=['GET'])
 @login_required
 def get_history():
-    results = ComplexityResult.query.filter_by(user_id=current_user.id).order_by(ComplexityResult.timestamp.desc()).all()
+    pending = pending_writes()
+    etag = history_etag(current_user.id)
+    if pending:
+        # Queued results are part of the answer until they are committed,
+        # which bumps the version.
+        etag += f'-q{pending[-1][0]}'
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    results = (
+        db.session.query(ComplexityResult, ResultMetrics)
+        .outerjoin(ResultMetrics, ResultMetrics.result_id == ComplexityResult.id)
+        .filter(ComplexityResult.user_id == current_user.id)
+        .order_by(ComplexityResult.timestamp.desc())
+        .all()
+    )
+    stored_ids = {r.id for r, _ in results}
+    queued = []
+    for _, (_, pairs) in pending:
+        rows = dict(pairs)
+        result = rows[ComplexityResult][0]
+        if result['id'] not in stored_ids:
+            queued.append((stored_row(ComplexityResult, None, rows), stored_row(ResultMetrics, None, rows)))
+    if queued:
+        results = sorted(queued + results, key=lambda pair: pair[0].timestamp, reverse=True)
     data = [
         {
             'filename': r.filename,
@@ -202,95 +868,259 @@ def get_history():
             'dc': r.dc,
             'cc': r.cc,
             'code': r.code,
+            'metrics': m.to_dict() if m else {},
             'timestamp': r.timestamp.strftime("%Y-%m-%d %H:%M:%S")
         }
-        for r in results
+        for r, m in results
     ]
-    return jsonify(data)
+    return with_etag(jsonify(data), etag)
 
 
-@app.route('/history/<int:entry_id>', methods=['DELETE'])
+@api.route('/history/<int:entry_id>', methods=['DELETE'])
 @login_required
 def delete_entry(entry_id):
+    settle_writes()
     entry = ComplexityResult.query.filter_by(id=entry_id, user_id=current_user.id).first()
     if not entry:
         return jsonify({'error': 'Entry not found'}), 404
+    Hotspot.query.filter_by(result_id=entry.id).delete()
+    ResultMetrics.query.filter_by(result_id=entry.id).delete()
+    ResultDetail.query.filter_by(result_id=entry.id).delete()
+    ResultBlock.query.filter_by(result_id=entry.id).delete()
+    AnalysisJob.query.filter_by(result_id=entry.id).delete()
     db.session.delete(entry)
+    bump_history_version(current_user.id)
     db.session.commit()
     return jsonify({'message': 'Deleted successfully'}), 200
 
 
-# ------------------ CSV Export ------------------ #
-@app.route('/download/csv', methods=['GET'])
+# ------------------ Top-K Hotspots ------------------ #
+@api.route('/hotspots', methods=['GET'])
 @login_required
-def download_csv():
-    latest = session.get('latest_result')
-    if not latest:
-        return jsonify({'error': 'No recent analysis found'}), 400
-
-    if 'line_dc_map' not in latest or not latest['line_dc_map']:
-        code = latest.get('code', '')
-        language = latest.get('language', '').lower()
-        if language == 'python':
-            result = analyze_python_code(code)
-            line_dc_map = result['line_scores']
-        elif language == 'java':
-            result = calculate_java_complexity(code)
-            line_dc_map = result.get('line_scores', {})
-        elif language == 'c++':
-            result = analyze_cpp_code(code)
-            line_dc_map = result.get('line_scores', {})
-        else:
-            line_dc_map = {}
-        latest['line_dc_map'] = line_dc_map
+def get_hotspots():
+    pending = pending_writes()
+    kind = request.args.get('kind', '').lower()
+    language = request.args.get('language', '').lower()
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_HOTSPOT_LIMIT)
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since = datetime.datetime.strptime(since, "%Y-%m-%d") if since else None
+        until = datetime.datetime.strptime(until, "%Y-%m-%d") + datetime.timedelta(days=1) if until else None
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or date (expected YYYY-MM-DD)'}), 400
+    if kind and kind not in HOTSPOT_KINDS:
+        return jsonify({'error': 'Unsupported kind'}), 400
+
+    # kind/language are equality filters on the leading columns of the
+    # (user_id, ..., dc) indexes, so SQLite walks one backwards and
+    # stops after `limit` rows.
+    query = Hotspot.query.filter_by(user_id=current_user.id)
+    if kind:
+        query = query.filter_by(kind=kind)
+    if language:
+        query = query.filter_by(language=language)
+    if since or until:
+        ids = top_hotspot_ids(query, limit, since, until)
+        query = Hotspot.query.filter(Hotspot.id.in_(ids)) if ids else None
+    hotspots = query.order_by(Hotspot.dc.desc()).limit(limit).all() if query else []
+
+    queued = [
+        row for _, (_, pairs) in pending for model, rows in pairs if model is Hotspot for row in rows
+        if (not kind or row['kind'] == kind) and (not language or row['language'] == language)
+        and (not since or row['timestamp'] >= since) and (not until or row['timestamp'] < until)
+    ]
+    if queued:
+        # Rows still in the write-behind queue compete for the top K too; a
+        # row committed since the queue was read is skipped the second time.
+        stored = {(h.result_id, h.kind, h.name, h.line) for h in hotspots}
+        queued = [Hotspot(**as_stored(Hotspot, row))
+                  for row in heapq.nlargest(limit, queued, key=lambda row: row['dc'])]
+        hotspots = heapq.nlargest(limit, hotspots + [
+            h for h in queued if (h.result_id, h.kind, h.name, h.line) not in stored
+        ], key=lambda h: h.dc)
+
+    data = [
+        {
+            'result_id': h.result_id,
+            'filename': h.filename,
+            'language': h.language,
+            'kind': h.kind,
+            'name': h.name,
+            'line': h.line,
+            'dc': h.dc,
+            'cc': h.cc,
+            'timestamp': h.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        for h in hotspots
+    ]
+    return jsonify(data)
 
-    csv_stream = generate_csv(latest)
-    return send_file(
-        csv_stream,
-        mimetype='text/csv',
+
+def top_hotspot_ids(query, limit, since, until):
+    bounds = []
+    if since:
+        bounds.append(Hotspot.timestamp >= since)
+    if until:
+        bounds.append(Hotspot.timestamp < until)
+
+    in_range = Hotspot.query.filter_by(user_id=current_user.id).filter(*bounds)
+    if in_range.with_entities(Hotspot.id).limit(HOTSPOT_RANGE_ROWS).count() < HOTSPOT_RANGE_ROWS:
+        # A short range: scan it through the (user_id, timestamp, dc) index
+        # and keep the top `limit` in a bounded heap.
+        rows = query.filter(*bounds).with_entities(Hotspot.dc, Hotspot.id)
+        return [hotspot_id for _, hotspot_id in heapq.nlargest(limit, rows)]
+
+    # A long range holds a good share of the rows, so the dc-ordered walk
+    # reaches `limit` of them quickly; the dates are checked here rather
+    # than in SQL, where they would steer SQLite onto the timestamp index.
+    ids = []
+    walk = query.with_entities(Hotspot.id, Hotspot.timestamp).order_by(Hotspot.dc.desc())
+    for hotspot_id, timestamp in walk.yield_per(500):
+        if (not since or timestamp >= since) and (not until or timestamp < until):
+            ids.append(hotspot_id)
+            if len(ids) == limit:
+                break
+    return ids
+
+
+# ------------------ Report Data ------------------ #
+REPORT_MIMETYPES = {'csv': 'text/csv', 'pdf': 'application/pdf'}
+
+
+def as_submitted(score):
+    # The dc/cc columns are floats; integral scores go into reports the way
+    # the analyzers returned them (8, not 8.0).
+    return int(score) if isinstance(score, float) and score.is_integer() else score
+
+
+def load_latest_result(latest):
+    if 'id' not in latest:
+        # Sessions from before results were referenced by id.
+        latest = dict(latest, pending=False)
+        if not latest.get('line_dc_map'):
+            latest['line_dc_map'] = run_analysis(latest['language'], latest['code'])['line_dc_map']
+        return latest
+
+    queued = queued_result(latest['id'])
+    if queued:
+        entry = stored_row(ComplexityResult, latest['id'], queued)
+    else:
+        entry = ComplexityResult.query.filter_by(id=latest['id'], user_id=current_user.id).first()
+    if not entry:
+        return None
+    job = stored_row(AnalysisJob, entry.id, queued)
+    report = {
+        'filename': entry.filename,
+        'language': entry.language,
+        'dc': as_submitted(entry.dc),
+        'cc': as_submitted(entry.cc),
+        'code': entry.code,
+        'pending': bool(job) and job.status != 'done'
+    }
+    detail = stored_row(ResultDetail, entry.id, queued)
+    if detail:
+        report['line_dc_map'] = {int(k): v for k, v in json.loads(detail.line_scores).items()}
+    elif report['pending']:
+        report['line_dc_map'] = estimate_complexity(entry.code, entry.language)['line_scores']
+    else:
+        report['line_dc_map'] = run_analysis(entry.language, entry.code)['line_dc_map']
+    return report
+
+
+def send_report(path_or_stream, ext, etag):
+    response = send_file(
+        path_or_stream,
+        mimetype=REPORT_MIMETYPES[ext],
         as_attachment=True,
-        download_name='complexity_report.csv'
+        download_name=f'complexity_report.{ext}'
     )
+    return with_etag(response, f'{etag}-{ext}') if etag else response
+
+
+def cached_report(etag, ext):
+    if not etag:
+        return None
+    cached = not_modified(f'{etag}-{ext}')
+    if cached:
+        return cached
+    path = current_app.extensions['export_cache'].get(etag, ext)
+    return send_report(path, ext, etag) if path else None
+
+
+def render_report(report, etag, ext, render):
+    # Reports of results still being refined are sent uncached: their
+    # numbers will change when the exact analysis lands.
+    stream = render(report)
+    if not etag:
+        return send_report(stream, ext, None)
+    return send_report(current_app.extensions['export_cache'].put(etag, ext, stream), ext, etag)
+
+
+def latest_report(ext):
+    # Returns (report, etag, response); a response short-circuits the export.
+    latest = session.get('latest_result')
+    if not latest:
+        return None, None, (jsonify({'error': 'No recent analysis found'}), 400)
+
+    etag = latest.get('etag')
+    cached = cached_report(etag, ext)
+    if cached:
+        return None, etag, cached
+
+    report = load_latest_result(latest)
+    if not report:
+        return None, None, (jsonify({'error': 'No recent analysis found'}), 400)
+    if not etag and not report['pending']:
+        etag = content_etag(report)
+        cached = cached_report(etag, ext)
+        if cached:
+            return None, etag, cached
+    return report, etag, None
+
+
+# ------------------ CSV Export ------------------ #
+@api.route('/download/csv', methods=['GET'])
+@login_required
+def download_csv():
+    report, etag, response = latest_report('csv')
+    if response:
+        return response
+    return render_report(report, etag, 'csv', generate_csv)
 
 
 # ------------------ PDF Export ------------------ #
-@app.route('/download/pdf', methods=['GET'])
+@api.route('/download/pdf', methods=['GET'])
 @login_required
 def download_pdf():
-    latest = session.get('latest_result')
-    if not latest:
-        return jsonify({'error': 'No recent analysis found'}), 400
-
-    if 'line_dc_map' not in latest or not latest['line_dc_map']:
-        code = latest.get('code', '')
-        language = latest.get('language', '').lower()
-        if language == 'python':
-            result = analyze_python_code(code)
-            line_dc_map = result['line_scores']
-        elif language == 'java':
-            result = calculate_java_complexity(code)
-            line_dc_map = result.get('line_scores', {})
-        elif language == 'c++':
-            result = analyze_cpp_code(code)
-            line_dc_map = result.get('line_scores', {})
-        else:
-            line_dc_map = {}
-        latest['line_dc_map'] = line_dc_map
+    # Revalidations and cached reports are not charged against the PDF bucket.
+    report, etag, response = latest_report('pdf')
+    if response:
+        return response
 
-    pdf_stream = generate_pdf(latest)
-    return send_file(
-        pdf_stream,
-        as_attachment=True,
-        download_name='complexity_report.pdf',
-        mimetype='application/pdf'
-    )
+    pages = estimate_pdf_pages(report['code'].count('\n') + 1)
+    limited = check_rate_limit('pdf', pages)
+    if limited:
+        return limited
+    return render_report(report, etag, 'pdf', generate_pdf)
 
 
 # ------------------ App Runner ------------------ #
-def start():
+def start(app):
     with app.app_context():
         db.create_all()
+        # create_all skips existing tables, so indexes added to a table
+        # after it was created are made here.
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # Runs before this server answers anything, so no exact analysis
+        # started by an earlier run of it is still going.
+        fail_stale_jobs()
 
 if __name__ == '__main__':
-    start()
+    app = create_app()
+    start(app)
+    # Exit through SystemExit on SIGTERM so atexit drains the write queue.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(debug=True, threaded=False)
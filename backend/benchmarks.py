@@ -0,0 +1,254 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from backend.app import create_app, start, run_analysis, result_rows, write_results, ComplexityResult
+from backend.database import db
+from backend.estimate import estimate_complexity
+from backend.loadtest import make_corpus, python_source, brace_source, percentile
+from backend.parallel_analysis import SERIAL_ANALYZERS, CHUNKS_PER_WORKER, ParallelAnalyzer
+
+# Offline benchmarks for the analysis and persistence paths. Each prints a
+# table and, with --output, writes the same numbers as JSON.
+#
+#   python -m backend.benchmarks estimate                 # error of the estimate vs exact
+#   python -m backend.benchmarks parallel --lines 100000 --workers 1,2,4
+#   python -m backend.benchmarks writes --threads 8 --seconds 10
+#   python -m backend.benchmarks estimate --output estimate_error.json
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'samples')
+SAMPLE_LANGUAGES = {'.java': 'java', '.cpp': 'c++'}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def write_report(report, path):
+    if path:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+# ------------------ Estimate Error ------------------ #
+def benchmark_corpus():
+    # (language, source, code). Synthetic samples share their shapes with
+    # the estimator's assumptions, so hand-written code is reported apart:
+    # the samples directory for Java/C++ and the analyzers themselves for
+    # Python.
+    corpus = []
+    for seed in range(5):
+        corpus += [(c['language'], 'synthetic', c['code']) for c in make_corpus(seed)]
+    here = os.path.dirname(os.path.abspath(__file__))
+    for directory, languages in ((here, {'.py': 'python'}), (SAMPLES_DIR, SAMPLE_LANGUAGES)):
+        for name in sorted(os.listdir(directory)):
+            language = languages.get(os.path.splitext(name)[1])
+            if language:
+                with open(os.path.join(directory, name)) as f:
+                    corpus.append((language, 'hand-written', f.read()))
+    return corpus
+
+
+def relative_error(estimate, exact):
+    if exact == 0:
+        return 0.0 if estimate == 0 else 1.0
+    return abs(estimate - exact) / abs(exact)
+
+
+def measure_error(corpus):
+    per_language = {}
+    for language, source, code in corpus:
+        exact, exact_time = timed(run_analysis, language, code)
+        estimate, estimate_time = timed(estimate_complexity, code, language)
+
+        stats = per_language.setdefault(f'{language} {source}', {
+            'samples': 0, 'dc_errors': [], 'cc_errors': [], 'exact_s': 0.0, 'estimate_s': 0.0})
+        stats['samples'] += 1
+        stats['dc_errors'].append(relative_error(estimate['dc'], exact['dc']))
+        stats['cc_errors'].append(relative_error(estimate['cc'], exact['cc']))
+        stats['exact_s'] += exact_time
+        stats['estimate_s'] += estimate_time
+
+    report = {}
+    for language, stats in per_language.items():
+        report[language] = {
+            'samples': stats['samples'],
+            'dc_mean_abs_pct_error': 100 * sum(stats['dc_errors']) / stats['samples'],
+            'dc_max_abs_pct_error': 100 * max(stats['dc_errors']),
+            'cc_mean_abs_pct_error': 100 * sum(stats['cc_errors']) / stats['samples'],
+            'cc_max_abs_pct_error': 100 * max(stats['cc_errors']),
+            'speedup': stats['exact_s'] / stats['estimate_s'] if stats['estimate_s'] else None,
+        }
+    return report
+
+
+def estimate_main(args):
+    report = measure_error(benchmark_corpus())
+    print(f"{'language / source':<24}{'n':>4}{'DC err mean/max %':>20}{'CC err mean/max %':>20}{'speedup':>10}")
+    for language, r in sorted(report.items()):
+        print(f"{language:<24}{r['samples']:>4}"
+              f"{r['dc_mean_abs_pct_error']:>12.1f} /{r['dc_max_abs_pct_error']:>5.0f}"
+              f"{r['cc_mean_abs_pct_error']:>12.1f} /{r['cc_max_abs_pct_error']:>5.0f}"
+              f"{r['speedup']:>9.1f}x")
+    return report
+
+
+# ------------------ Intra-file Parallelism ------------------ #
+def benchmark_source(language, lines, seed=0):
+    rng = random.Random(seed)
+    if language == 'python':
+        return python_source(lines, rng)
+    return brace_source(lines, rng, language == 'java')
+
+
+def run_parallel(lines, worker_counts, languages, repeat=1):
+    report = {'lines': lines, 'cpus': os.cpu_count(), 'languages': {}}
+    for language in languages:
+        code = benchmark_source(language, lines)
+        serial, serial_s = min((timed(SERIAL_ANALYZERS[language], code) for _ in range(repeat)),
+                               key=lambda run: run[1])
+        runs = {}
+        for workers in worker_counts:
+            analyzer = ParallelAnalyzer(workers, min_lines=1)
+            if workers > 1:
+                # Start the pool (and its imports) outside the timing.
+                analyzer.analyze(language, benchmark_source(language, workers * CHUNKS_PER_WORKER * 50))
+            result, elapsed = min((timed(analyzer.analyze, language, code) for _ in range(repeat)),
+                                  key=lambda run: run[1])
+            analyzer.shutdown()
+            runs[workers] = {
+                'seconds': round(elapsed, 3),
+                'speedup': round(serial_s / elapsed, 2),
+                'identical': repr(result) == repr(serial),
+            }
+        report['languages'][language] = {'serial_seconds': round(serial_s, 3), 'workers': runs}
+    return report
+
+
+def parallel_main(args):
+    report = run_parallel(args.lines, [int(w) for w in args.workers.split(',')],
+                          args.languages.split(','), args.repeat)
+    print(f"{report['lines']} lines, {report['cpus']} CPUs")
+    print(f"{'language':<10}{'serial s':>10}{'workers':>9}{'s':>9}{'speedup':>9}{'identical':>11}")
+    for language, r in report['languages'].items():
+        for workers, run in r['workers'].items():
+            print(f"{language:<10}{r['serial_seconds']:>10.2f}{workers:>9}{run['seconds']:>9.2f}"
+                  f"{run['speedup']:>8.2f}x{str(run['identical']):>11}")
+    return report
+
+
+# ------------------ Result Writes ------------------ #
+# sync: commit each submission before answering (WRITE_BEHIND = False)
+# group: queue, then wait for the batch's commit (WRITE_SYNC_COMMIT)
+# behind: queue and answer (the default)
+WRITE_MODES = {
+    'sync': {'WRITE_BEHIND': False},
+    'group': {'WRITE_SYNC_COMMIT': True},
+    'behind': {},
+}
+
+
+def run_writes(mode, threads, seconds, language, code, analysis, directory):
+    app = create_app(dict(WRITE_MODES[mode], SQLALCHEMY_DATABASE_URI=f'sqlite:///{directory}/{mode}.db'))
+    start(app)
+    writer = app.extensions['result_writer']
+    ids = app.extensions['result_ids']
+    latencies = [[] for _ in range(threads)]
+
+    def submit_results(samples, deadline):
+        # What /analyze does after analyzing: build the rows and store them.
+        with app.app_context():
+            while time.monotonic() < deadline:
+                began = time.perf_counter()
+                result = {'id': ids.next_id(), 'user_id': 1, 'filename': 'bench', 'language': language,
+                          'dc': analysis['dc'], 'cc': analysis['cc'], 'code': code,
+                          'timestamp': datetime.datetime.utcnow()}
+                item = (1, result_rows(result, analysis))
+                if writer:
+                    seq = writer.submit(1, item, track=mode == 'group')
+                    if mode == 'group':
+                        writer.wait(seq)
+                else:
+                    write_results([item])
+                    db.session.commit()
+                samples.append(time.perf_counter() - began)
+
+    began = time.monotonic()
+    workers = [threading.Thread(target=submit_results, args=(samples, began + seconds)) for samples in latencies]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if writer:
+        writer.close()
+    # Writes/sec counts what reached the database, including the drain.
+    elapsed = time.monotonic() - began
+    with app.app_context():
+        stored = ComplexityResult.query.count()
+        db.engine.dispose()
+    samples = sorted(s for thread_samples in latencies for s in thread_samples)
+    return {
+        'writes': stored,
+        'writes_per_s': round(stored / elapsed, 1),
+        'p50_ms': round(1000 * percentile(samples, 50), 2),
+        'p99_ms': round(1000 * percentile(samples, 99), 2),
+    }
+
+
+def writes_main(args):
+    language, size = args.sample.split(':')
+    code = next(s['code'] for s in make_corpus(0) if s['language'] == language and s['size'] == size)
+    analysis = run_analysis(language, code)
+    report = {'threads': args.threads, 'seconds': args.seconds, 'sample': args.sample,
+              'cpus': os.cpu_count(), 'modes': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes.split(','):
+            report['modes'][mode] = run_writes(mode, args.threads, args.seconds, language,
+                                               code, analysis, directory)
+
+    print(f"{args.sample}, {args.threads} threads, {args.seconds:g}s, {report['cpus']} CPUs")
+    print(f"{'mode':<8}{'writes':>8}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for mode, r in report['modes'].items():
+        print(f"{mode:<8}{r['writes']:>8}{r['writes_per_s']:>10.1f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the complexity service')
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--output', help='Write the JSON report here')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    estimate = commands.add_parser('estimate', parents=[output],
+                                   help='Measure the fast estimate against the exact analyzers')
+    estimate.set_defaults(run=estimate_main)
+
+    parallel = commands.add_parser('parallel', parents=[output],
+                                   help='Benchmark intra-file parallel analysis against a serial run')
+    parallel.add_argument('--lines', type=int, default=100000)
+    parallel.add_argument('--workers', default='1,2,4', help='Comma-separated worker counts')
+    parallel.add_argument('--languages', default='python,java,c++')
+    parallel.add_argument('--repeat', type=int, default=1)
+    parallel.set_defaults(run=parallel_main)
+
+    writes = commands.add_parser('writes', parents=[output],
+                                 help='Measure result writes/sec with and without write-behind')
+    writes.add_argument('--threads', type=int, default=8)
+    writes.add_argument('--seconds', type=float, default=10)
+    writes.add_argument('--modes', default='sync,group,behind')
+    writes.add_argument('--sample', default='java:medium', help='language:size from the load-test corpus')
+    writes.set_defaults(run=writes_main)
+
+    args = parser.parse_args(argv)
+    write_report(args.run(args), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import os
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+db = SQLAlchemy()
+
+DEFAULT_DATABASE_URL = 'sqlite:///complexity.db'
+
+
+def database_url():
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    # Heroku-style URLs use the scheme SQLAlchemy dropped in 1.4.
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url, pool_size=5, busy_timeout=30):
+    options = {'pool_pre_ping': True}
+    if url.startswith('sqlite'):
+        if ':memory:' in url or url in ('sqlite://', 'sqlite:///'):
+            return options
+        # sqlite3's `timeout` is how long a connection waits on a locked
+        # database before raising "database is locked".
+        options['connect_args'] = {'timeout': busy_timeout, 'check_same_thread': False}
+    options['pool_size'] = pool_size
+    options['max_overflow'] = pool_size * 2
+    return options
+
+
+def configure_database(app):
+    url = app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_url())
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(
+        url,
+        pool_size=app.config.get('DB_POOL_SIZE', 5),
+        busy_timeout=app.config.get('DB_BUSY_TIMEOUT', 30)
+    ))
+    db.init_app(app)
+
+    if url.startswith('sqlite'):
+        with app.app_context():
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer, and NORMAL sync only
+    # fsyncs at checkpoints, which is still durable against process crashes.
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
@@ -0,0 +1,141 @@
+import re
+
+from backend.cpp_complexity import CPP_FUNCTION, excluded_calls
+from backend.java_complexity import JAVA_METHOD
+
+# Cheap single-scan estimate of DC/CC for inputs too large to analyze within
+# the /analyze latency budget. It mirrors the weighting of the exact analyzers
+# (base weight x nesting depth x condition tokens) but replaces the AST walk /
+# per-structure bookkeeping with one regex per decision line, taking nesting
+# from indentation (Python) or block-closing braces (Java/C++).
+#
+#   python -m backend.benchmarks estimate     # error of the estimate vs exact
+
+PY_DECISION = re.compile(r'(if|elif|while|for|try)\b')
+PY_CONTINUATION = re.compile(r'(elif|else)\b')
+PY_BOOLEAN = re.compile(r'\b(?:and|or)\b')
+PY_TOKEN = re.compile(
+    r'\b(?:and|or|not|in|is|if|elif|while)\b'
+    r'|\d[\w.]*|"[^"]*"|\'[^\']*\'|[A-Za-z_]\w*'
+    r'|==|!=|<=|>=|//|\*\*|[<>+\-*/%]'
+)
+PY_SKIPPED_TOKENS = {'and', 'or', 'not', 'if', 'elif', 'while'}
+PY_OPERATORS = {'in', 'is', '==', '!=', '<=', '>=', '//', '**', '<', '>', '+', '-', '*', '/', '%'}
+
+C_DECISION = re.compile(r'(if|else if|for|while|switch|case|catch)\b')
+C_BOOLEAN = re.compile(r'&&|\|\|')
+C_TOKEN = re.compile(r'\b\w+\b|&&|\|\||\?|[=!<>+\-*/%]')
+
+BASE_WEIGHTS = {
+    'if': 2, 'elif': 2, 'else if': 2, 'for': 2, 'while': 3,
+    'switch': 2, 'case': 1, 'catch': 1, 'try': 1, 'ternary': 2
+}
+
+
+def python_condition_tokens(text):
+    # conditions + operators + operands, as _extract_tokens counts them
+    conds = 1 + len(PY_BOOLEAN.findall(text))
+    ops = operands = 0
+    for token in PY_TOKEN.findall(text):
+        if token in PY_OPERATORS:
+            ops += 1
+        elif token not in PY_SKIPPED_TOKENS:
+            operands += 1
+    return conds + ops + operands
+
+
+def estimate_python(code):
+    dc = 0
+    bool_ops = 0
+    line_scores = {}
+    open_blocks = []  # indentation of each enclosing if/elif/for/while
+
+    for i, line in enumerate(code.split('\n'), start=1):
+        stripped = line.strip()
+        if not stripped or stripped[0] == '#':
+            continue
+        indent = len(line) - len(line.lstrip())
+        # elif/else continue the block opened at their own indentation.
+        if PY_CONTINUATION.match(stripped):
+            while open_blocks and open_blocks[-1] > indent:
+                open_blocks.pop()
+        else:
+            while open_blocks and open_blocks[-1] >= indent:
+                open_blocks.pop()
+
+        bool_ops += len(PY_BOOLEAN.findall(stripped))
+        match = PY_DECISION.match(stripped)
+        weight = 0
+        if match:
+            keyword = match.group(1)
+            if keyword == 'try':
+                weight = max(len(open_blocks), 1)
+            else:
+                depth = len(open_blocks) + 1
+                tokens = 1 if keyword == 'for' else python_condition_tokens(stripped[len(keyword):].rsplit(':', 1)[0])
+                weight = depth * BASE_WEIGHTS[keyword] * tokens
+                open_blocks.append(indent)
+        elif ' if ' in stripped and ' else ' in stripped:
+            condition = stripped.split(' if ', 1)[1].split(' else ', 1)[0]
+            weight = max(len(open_blocks), 1) * BASE_WEIGHTS['ternary'] * python_condition_tokens(condition)
+        if weight:
+            dc += weight
+            line_scores[i] = line_scores.get(i, 0) + weight
+
+    return {'dc': dc, 'cc': 1 + bool_ops, 'line_scores': line_scores}
+
+
+def estimate_c_like(code, cpp=False):
+    dc = 0
+    decisions = 0
+    line_scores = {}
+    # Same nesting rule as the line scanners: each decision line opens a
+    # level and each line containing '}' closes one.
+    nesting = 0
+    # The C++ scanner only looks for a function definition outside one,
+    # which any line containing '}' ends.
+    inside_method = False
+
+    for i, line in enumerate(code.split('\n'), start=1):
+        stripped = line.strip()
+        if not stripped or stripped[0] in '/*':
+            continue
+        # The scanners' method patterns claim whole `else if (...)` lines
+        # before any decision matching, so those don't score; the C++ one
+        # only outside a method.
+        if cpp:
+            definition = not inside_method and '{' in stripped and CPP_FUNCTION.match(stripped)
+            if definition and definition.group(2) not in excluded_calls and not stripped.startswith('throw'):
+                inside_method = True
+                continue
+        elif stripped.startswith('else if') and JAVA_METHOD.match(stripped):
+            continue
+
+        keyword = None
+        if '?' in stripped and ':' in stripped:
+            keyword = 'ternary'
+            condition = stripped.split('?')[0]
+        else:
+            match = C_DECISION.match(stripped)
+            if match:
+                keyword = match.group(1)
+                condition = stripped[stripped.find('(') + 1:stripped.find(')')] if '(' in stripped and ')' in stripped else ''
+        if keyword:
+            weight = max(nesting, 1) * BASE_WEIGHTS[keyword] * (len(C_TOKEN.findall(condition)) + 1)
+            dc += weight
+            decisions += 1
+            line_scores[i] = line_scores.get(i, 0) + weight
+            if keyword != 'ternary':
+                nesting += 1
+        if '}' in stripped:
+            inside_method = False
+            if nesting:
+                nesting -= 1
+
+    return {'dc': dc, 'cc': 1 + decisions, 'line_scores': line_scores}
+
+
+def estimate_complexity(code, language):
+    if language == 'python':
+        return estimate_python(code)
+    return estimate_c_like(code, cpp=language == 'c++')
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+import tempfile
+
+
+def content_etag(result_data):
+    # line_dc_map is derived from the code, so the report contents are fully
+    # determined by these fields.
+    payload = json.dumps(
+        [result_data.get(k) for k in ('filename', 'language', 'dc', 'cc', 'code')],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ExportCache:
+    # Rendered CSV/PDF bytes on disk, keyed by the same content hash that is
+    # sent as the ETag, so a repeat download is a file read, not a re-render.
+    def __init__(self, directory, max_files=500):
+        self.directory = directory
+        self.max_files = max_files
+
+    def path(self, key, ext):
+        return os.path.join(self.directory, f'{key}.{ext}')
+
+    def get(self, key, ext):
+        path = self.path(key, ext)
+        return path if os.path.exists(path) else None
+
+    def put(self, key, ext, stream):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temp file and rename so concurrent readers never see a
+        # partially written report.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(stream.getvalue())
+        path = self.path(key, ext)
+        os.replace(tmp_path, path)
+        self._prune()
+        return path
+
+    def _prune(self):
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                   if not name.endswith('.tmp')]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
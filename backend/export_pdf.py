@@ -1,9 +1,23 @@
 import io
+import math
 import matplotlib.pyplot as plt
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.utils import ImageReader
 
+from backend.heatmap import HEAT_RGB, heat_bucket
+
+# Heatmap rows per page as laid out by generate_pdf: the first page starts at
+# y=420 below the chart, later pages at y=750, 12pt per row down to y=50.
+FIRST_PAGE_LINES = 31
+PAGE_LINES = 59
+
+
+def estimate_pdf_pages(line_count):
+    if line_count <= FIRST_PAGE_LINES:
+        return 1
+    return 1 + math.ceil((line_count - FIRST_PAGE_LINES) / PAGE_LINES)
+
 
 def generate_pdf(result_data):
     # Generate DC vs CC bar chart
@@ -57,12 +71,7 @@ def generate_pdf(result_data):
     for idx, line in enumerate(code_lines):
         score = line_scores.get(idx + 1, 0)
         # Background color
-        if score >= 10:
-            c.setFillColorRGB(1, 0.8, 0.8)
-        elif score >= 5:
-            c.setFillColorRGB(1, 1, 0.7)
-        else:
-            c.setFillColorRGB(0.8, 1, 0.8)
+        c.setFillColorRGB(*HEAT_RGB[heat_bucket(score)])
         c.rect(45, y - 2, 510, 12, fill=1, stroke=0)
 
         # Text
@@ -0,0 +1,73 @@
+import math
+
+# Heatmap buckets shared by the PDF report and the windowed heatmap endpoint:
+# a line DC of at least 10 is high, 5-9 medium and 0-4 low.
+HEAT_BUCKETS = (
+    ('high', 10, (1, 0.8, 0.8)),
+    ('medium', 5, (1, 1, 0.7)),
+    ('low', 0, (0.8, 1, 0.8)),
+)
+HEAT_RGB = {name: rgb for name, _, rgb in HEAT_BUCKETS}
+HEAT_COLORS = {name: '#%02x%02x%02x' % tuple(round(c * 255) for c in rgb) for name, _, rgb in HEAT_BUCKETS}
+
+# Stored results are split into blocks of this many lines, the unit a
+# heatmap window is loaded in and the finest resolution of the minimap.
+BLOCK_LINES = 256
+
+
+def heat_bucket(score):
+    for name, minimum, _ in HEAT_BUCKETS:
+        if score >= minimum:
+            return name
+    return 'low'
+
+
+def build_blocks(code, line_scores):
+    lines = code.split('\n')
+    blocks = []
+    for index, start in enumerate(range(0, len(lines), BLOCK_LINES)):
+        end = min(start + BLOCK_LINES, len(lines))
+        scores = {line: line_scores[line] for line in range(start + 1, end + 1) if line in line_scores}
+        blocks.append({
+            'block': index,
+            'start_line': start + 1,
+            'end_line': end,
+            'max_dc': max(scores.values(), default=0),
+            'total_dc': sum(scores.values()),
+            'line_scores': scores,
+            'code': '\n'.join(lines[start:end])
+        })
+    return blocks
+
+
+def window_lines(blocks, start, end):
+    rows = []
+    for block in blocks:
+        scores = block['line_scores']
+        for offset, text in enumerate(block['code'].split('\n')):
+            line = block['start_line'] + offset
+            if start <= line <= end:
+                score = scores.get(line, 0)
+                bucket = heat_bucket(score)
+                rows.append({'line': line, 'code': text, 'dc': score, 'bucket': bucket, 'color': HEAT_COLORS[bucket]})
+    return rows
+
+
+def overview(blocks, count):
+    # Adjacent blocks merged down to at most `count` entries, each colored by
+    # its hottest line so a single hotspot still shows on the minimap.
+    per_entry = max(1, math.ceil(len(blocks) / count))
+    entries = []
+    for i in range(0, len(blocks), per_entry):
+        group = blocks[i:i + per_entry]
+        max_dc = max(block['max_dc'] for block in group)
+        bucket = heat_bucket(max_dc)
+        entries.append({
+            'start': group[0]['start_line'],
+            'end': group[-1]['end_line'],
+            'max_dc': max_dc,
+            'total_dc': sum(block['total_dc'] for block in group),
+            'bucket': bucket,
+            'color': HEAT_COLORS[bucket]
+        })
+    return entries
@@ -1,9 +1,60 @@
 import re
 
+from backend.metrics import (MetricCounter, ScopeMetrics, c_like_tokens, c_like_cognitive, count_line, add_cognitive,
+                             open_scopes, drop_unopened, close_scopes, end_scopes)
+
 decision_keywords = ['if', 'else if', 'for', 'while', 'switch', 'case', 'catch', '?']
 
+JAVA_CLASS = re.compile(r'\bclass\s+(\w+)')
+JAVA_METHOD = re.compile(r'(?:public|private|protected)?\s*(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\([^)]*\)\s*\{?')
+DECISION = re.compile(r'(if|else if|for|while|switch|case|catch)\b')
+
 def calculate_java_complexity(code):
     lines = code.split('\n')
+    return fold_java_lines(scan_java_lines(lines), len(lines))
+
+def scan_java_lines(lines, first_line=1):
+    # Everything the scan needs from a line that doesn't depend on the lines
+    # before it, one record per non-comment line. Very large files scan
+    # chunks of lines in parallel and fold the records in order
+    # (backend.parallel_analysis).
+    records = []
+    for i, line in enumerate(lines, start=first_line):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//') or stripped.startswith('/*') or stripped.startswith('*'):
+            continue
+
+        operators, operands = c_like_tokens(stripped)
+        class_name = method_name = keyword = None
+        weight = cognitive = 0
+        nests = False
+
+        class_match = JAVA_CLASS.search(stripped)
+        if class_match:
+            class_name = class_match.group(1)
+        elif method_match := JAVA_METHOD.match(stripped):
+            method_name = method_match.group(1)
+        else:
+            cognitive, nests = c_like_cognitive(stripped)
+            if '?' in stripped and ':' in stripped:
+                keyword = 'ternary'
+            elif match := DECISION.match(stripped):
+                keyword = match.group(1)
+            if keyword:
+                # Weight at nesting 1; the fold scales it by the real depth.
+                weight, _ = process_condition(stripped, keyword, 1)
+
+        records.append((
+            i, class_name, method_name, keyword, weight, cognitive, nests,
+            stripped.count('{') - stripped.count('}'), 1 if stripped.startswith('}') else 0,
+            '}' in stripped, '{' in stripped,
+            # Lines holding nothing but braces are not logical lines.
+            1 if stripped.strip('{} ') else 0,
+            operators, operands
+        ))
+    return records
+
+def fold_java_lines(records, line_count):
     total_dc = 0
     cc = 1
     nesting_stack = []
@@ -21,52 +72,69 @@ def calculate_java_complexity(code):
     inside_method = False
     inside_class = False
 
-    for i, line in enumerate(lines, start=1):
-        stripped = line.strip()
-        if not stripped or stripped.startswith('//') or stripped.startswith('/*') or stripped.startswith('*'):
-            continue
+    # Metrics gathered in the same scan: one counter for the file and one per
+    # open method/class, tracked by brace depth separately from the DC/CC
+    # state above. Cognitive nesting is relative to the outermost open method
+    # body, so code in a nested (e.g. anonymous class) method nests deeper.
+    file_metrics = MetricCounter(1)
+    method_scopes = []
+    class_scopes = []
+    method_metrics = {}
+    class_metrics = {}
+    brace_depth = 0
+
+    for (i, class_name, method_name, keyword, weight, cognitive, nests, brace_delta,
+         leading_close, has_close, has_open, logical, operators, operands) in records:
+        depth_at_line = brace_depth
+        brace_depth += brace_delta
+        drop_unopened(method_scopes, method_metrics, has_open, logical)
+        drop_unopened(class_scopes, class_metrics, has_open, logical)
 
         # Class detection
-        class_match = re.search(r'\bclass\s+(\w+)', stripped)
-        if class_match:
+        if class_name:
             if current_class:
                 classes[current_class] = {'dc': class_dc, 'cc': class_cc}
                 class_dc, class_cc = 0, 1
-            current_class = class_match.group(1)
+            current_class = class_name
             inside_class = True
+            class_scopes.append(ScopeMetrics(class_name, i, depth_at_line))
+            count_line((file_metrics, *open_scopes(class_scopes, method_scopes)), operators, operands, logical)
+            close_scopes(class_scopes, class_metrics, brace_depth, has_open, i)
             continue
 
         # Method detection
-        method_match = re.match(r'(?:public|private|protected)?\s*(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\([^)]*\)\s*\{?', stripped)
-        if method_match:
+        if method_name:
             if current_method:
                 methods[current_method] = {'dc': method_dc, 'cc': method_cc}
                 method_dc, method_cc = 0, 1
-            current_method = method_match.group(1)
+            current_method = method_name
             inside_method = True
+            method_scopes.append(ScopeMetrics(method_name, i, depth_at_line))
+            count_line((file_metrics, *open_scopes(class_scopes, method_scopes)), operators, operands, logical)
+            close_scopes(method_scopes, method_metrics, brace_depth, has_open, i)
+            close_scopes(class_scopes, class_metrics, brace_depth, has_open, i)
             continue
 
+        counters = (file_metrics, *open_scopes(class_scopes, method_scopes))
+        count_line(counters, operators, operands, logical)
+        cognitive_nesting = max(0, depth_at_line - leading_close -
+                                (method_scopes[0].base_depth + 1 if method_scopes else 0))
+        if nests:
+            cognitive += 1 + cognitive_nesting
+        add_cognitive(counters, cognitive)
+        close_scopes(method_scopes, method_metrics, brace_depth, has_open, i)
+        close_scopes(class_scopes, class_metrics, brace_depth, has_open, i)
+
         nesting_level = len(nesting_stack)
 
-        # Ternary operator
-        if '?' in stripped and ':' in stripped:
-            dc, c = process_condition(stripped, 'ternary', nesting_level)
-            cc += c
-            method_cc += c
-            class_cc += c
-            total_dc += dc
-            method_dc += dc
-            class_dc += dc
-            line_scores[i] = line_scores.get(i, 0) + dc
-            update_structure(structures, 'ternary', nesting_level, nesting_stack)
-
-        elif match := re.match(r'(if|else if|for|while|switch|case|catch)\b', stripped):
-            keyword = match.group(1)
-            nesting_stack.append(keyword)
-            dc, c = process_condition(stripped, keyword, nesting_level)
-            cc += c
-            method_cc += c
-            class_cc += c
+        if keyword:
+            # Ternaries score at the current level without opening a new one.
+            if keyword != 'ternary':
+                nesting_stack.append(keyword)
+            dc = max(nesting_level, 1) * weight
+            cc += 1
+            method_cc += 1
+            class_cc += 1
             total_dc += dc
             method_dc += dc
             class_dc += dc
@@ -74,15 +142,15 @@ def calculate_java_complexity(code):
             update_structure(structures, keyword, nesting_level, nesting_stack)
 
         # End of block
-        if '}' in stripped:
+        if has_close:
             if nesting_stack:
                 nesting_stack.pop()
-            if inside_method and current_method and '{' not in stripped:
+            if inside_method and current_method and not has_open:
                 methods[current_method] = {'dc': method_dc, 'cc': method_cc}
                 current_method = None
                 method_dc, method_cc = 0, 1
                 inside_method = False
-            if inside_class and current_class and '{' not in stripped:
+            if inside_class and current_class and not has_open:
                 classes[current_class] = {'dc': class_dc, 'cc': class_cc}
                 current_class = None
                 class_dc, class_cc = 0, 1
@@ -92,14 +160,17 @@ def calculate_java_complexity(code):
         methods[current_method] = {'dc': method_dc, 'cc': method_cc}
     if current_class:
         classes[current_class] = {'dc': class_dc, 'cc': class_cc}
+    end_scopes(method_scopes, method_metrics, line_count)
+    end_scopes(class_scopes, class_metrics, line_count)
 
     return {
         'decisional_complexity': total_dc,
         'cyclomatic_complexity': cc,
         'line_scores': line_scores,
-        'methods': methods,
-        'classes': classes,
-        'structures': structures
+        'methods': {name: {**scores, **method_metrics[name]} for name, scores in methods.items()},
+        'classes': {name: {**scores, **class_metrics[name]} for name, scores in classes.items()},
+        'structures': structures,
+        'metrics': file_metrics.summary(ploc=line_count)
     }
 
 def process_condition(line, keyword, nesting):
@@ -0,0 +1,537 @@
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+# Mixed-workload load generator for the Flask service. It signs up synthetic
+# users, then each worker thread loops over a weighted mix of /analyze,
+# /history and /download/* until the duration elapses, recording latency per
+# route. Results are written as JSON so runs against different server
+# configurations can be compared with --compare.
+#
+# A server started here gets its own temporary database and export cache
+# (through a COMPLEXITY_SETTINGS file) and, unless --rate-limits says
+# otherwise, no effective rate limits, so the run measures the service rather
+# than the limiter and leaves instance/ alone.
+#
+#   python -m backend.loadtest --duration 30 --concurrency 8 --output run.json
+#   python -m backend.loadtest --url http://127.0.0.1:5000 --mix analyze=1
+#   python -m backend.loadtest --server-cmd 'python -m backend.serve --workers 4 --bind 127.0.0.1:{port}'
+#   python -m backend.loadtest --compare before.json after.json
+
+DEFAULT_MIX = 'analyze=6,history=2,csv=1,pdf=1'
+# Buckets no load test can drain, for --rate-limits off.
+UNLIMITED = {'capacity': 10 ** 12, 'refill_rate': 10 ** 12}
+SIZES = {'small': 40, 'medium': 400, 'large': 4000}
+LANGUAGES = ('python', 'java', 'c++')
+
+
+# ------------------ Synthetic Code ------------------ #
+# Samples vary the shapes hand-written code has (indentation, brace styles,
+# `} else if` on one line, conditions split over lines, comments, several
+# methods per class) so that no analyzer or estimator is only ever timed on
+# one layout.
+COMMENTS = ['validate the input first', 'TODO: cache this', 'fast path', 'keep the running total']
+
+
+def condition(rng, python):
+    both, either = (' and ', ' or ') if python else (' && ', ' || ')
+    parts = [rng.choice(['x > limit', 'x % {} == 0'.format(rng.randint(2, 9)), 'total < x', 'x != limit + 1'])
+             for _ in range(rng.randint(1, 3))]
+    text = parts[0]
+    for part in parts[1:]:
+        text += rng.choice([both, either]) + part
+    return text
+
+
+def split_condition(rng, head, text, tail, pad, python):
+    # `head (a && b) tail` on one line, or broken after its first boolean
+    # operator the way long conditions are wrapped.
+    operator = next((op for op in ((' and ', ' or ') if python else (' && ', ' || ')) if op in text), None)
+    if operator is None or rng.random() < 0.75:
+        return [f"{pad}{head}({text}){tail}" if not python else f"{pad}{head}{text}{tail}"]
+    left, right = text.split(operator, 1)
+    return [f"{pad}{head}({left}{operator.rstrip()}", f"{pad}        {right}){tail}"]
+
+
+def python_block(rng, indent, depth):
+    pad = '    ' * indent
+    kind = rng.choice(['if', 'for', 'while', 'try', 'ternary'] if depth < 3 else ['stmt', 'ternary'])
+    out = [f"{pad}# {rng.choice(COMMENTS)}"] if rng.random() < 0.1 else []
+    if kind == 'if':
+        out += split_condition(rng, 'if ', condition(rng, True), ':', pad, True) + python_block(rng, indent + 1, depth + 1)
+        for _ in range(rng.randint(0, 2)):
+            out += split_condition(rng, 'elif ', condition(rng, True), ':', pad, True) + python_block(rng, indent + 1, depth + 1)
+        if rng.random() < 0.5:
+            out += [f"{pad}else:", f"{pad}    total -= 1"]
+        return out
+    if kind == 'for':
+        return out + [f"{pad}for x in items:"] + python_block(rng, indent + 1, depth + 1)
+    if kind == 'while':
+        return out + [f"{pad}while {condition(rng, True)}:", f"{pad}    x -= 1"] + python_block(rng, indent + 1, depth + 1)
+    if kind == 'try':
+        return (out + [f"{pad}try:"] + python_block(rng, indent + 1, depth + 1)
+                + [f"{pad}except ValueError:", f"{pad}    total = 0"])
+    if kind == 'ternary':
+        return out + [f"{pad}total = x if {condition(rng, True)} else total"]
+    return out + [f"{pad}total += x"]
+
+
+def python_function(rng, name, indent):
+    pad = '    ' * indent
+    out = []
+    if indent and rng.random() < 0.2:
+        out.append(f"{pad}@staticmethod")
+        out.append(f"{pad}def {name}(items, limit):")
+    else:
+        out.append(f"{pad}def {name}({'self, ' if indent else ''}items, limit):")
+    if rng.random() < 0.3:
+        out.append(f'{pad}    """Score the items against limit."""')
+    out += [f"{pad}    total = 0", f"{pad}    x = limit"]
+    if rng.random() < 0.15:
+        out += [f"{pad}    def clamp(value):", f"{pad}        return value if value < limit else limit"]
+    for _ in range(rng.randint(1, 4)):
+        out += python_block(rng, indent + 1, 0)
+    out.append(f"{pad}    return total")
+    return out
+
+
+def python_source(lines, rng):
+    # Whole classes and functions only, so every sample parses.
+    out = []
+    while len(out) < lines:
+        n = len(out)
+        if rng.random() < 0.25:
+            out += python_function(rng, f"helper_{n}", 0) + [""]
+            continue
+        out += [f"class Service{n}:"]
+        for m in range(rng.randint(1, 3)):
+            out += python_function(rng, f"handle_{n}_{m}", 1)
+        out.append("")
+    return '\n'.join(out)
+
+
+def brace_open(head, pad, style):
+    if style == 'allman':
+        return [f"{pad}{head}", f"{pad}{{"]
+    return [f"{pad}{head} {{"]
+
+
+def brace_branch(rng, keyword, pad, depth, java, style):
+    # `keyword (condition)` and its body, without the closing brace.
+    head = split_condition(rng, f"{keyword} ", condition(rng, False), '', pad, False)
+    head += [f"{pad}{{"] if style == 'allman' else [head.pop() + ' {']
+    return head + brace_block(rng, depth + 1, java, style)
+
+
+def brace_block(rng, depth, java, style):
+    pad = '    ' * (depth + 2)
+    kind = rng.choice(['if', 'for', 'while', 'switch', 'try', 'ternary'] if depth < 3 else ['stmt', 'ternary'])
+    out = [f"{pad}// {rng.choice(COMMENTS)}"] if rng.random() < 0.1 else []
+    if kind == 'if':
+        out += brace_branch(rng, 'if', pad, depth, java, style)
+        branches = [('else if', True) for _ in range(rng.randint(0, 2))]
+        if rng.random() < 0.5:
+            branches.append(('else', False))
+        for keyword, conditional in branches:
+            if style == 'kr':
+                # `} else if (...) {` continues on the closing brace's line.
+                if conditional:
+                    branch = brace_branch(rng, keyword, pad, depth, java, style)
+                    out += [f"{pad}}} {branch[0].strip()}"] + branch[1:]
+                else:
+                    out += [f"{pad}}} else {{", f"{pad}    total--;"]
+                continue
+            out.append(f"{pad}}}")
+            if conditional:
+                out += brace_branch(rng, keyword, pad, depth, java, style)
+            else:
+                out += brace_open('else', pad, style) + [f"{pad}    total--;"]
+        return out + [f"{pad}}}"]
+    if kind == 'for':
+        head = 'for (int v : items)' if rng.random() < 0.5 else 'for (int i = 0; i < n; i++)'
+        body = [f"{pad}    x = v;" if ':' in head else f"{pad}    x = items[i];"]
+        return out + brace_open(head, pad, style) + body + brace_block(rng, depth + 1, java, style) + [f"{pad}}}"]
+    if kind == 'while':
+        return (out + brace_open(f"while ({condition(rng, False)})", pad, style) + [f"{pad}    x--;"]
+                + brace_block(rng, depth + 1, java, style) + [f"{pad}}}"])
+    if kind == 'switch':
+        out += brace_open('switch (x % 3)', pad, style)
+        for case in range(rng.randint(1, 3)):
+            out += [f"{pad}case {case}:", f"{pad}    total += x;", f"{pad}    break;"]
+        return out + [f"{pad}}}"]
+    if kind == 'try':
+        catch = 'catch (Exception e)' if java else 'catch (const std::exception& e)'
+        out += brace_open('try', pad, style) + brace_block(rng, depth + 1, java, style)
+        if style == 'kr':
+            out += [f"{pad}}} {catch} {{"]
+        else:
+            out += [f"{pad}}}"] + brace_open(catch, pad, style)
+        return out + [f"{pad}    total = 0;", f"{pad}}}"]
+    if kind == 'ternary':
+        return out + [f"{pad}total = ({condition(rng, False)}) ? x : total;"]
+    return out + [f"{pad}total += x;"]
+
+
+def brace_source(lines, rng, java):
+    head = 'public class' if java else 'class'
+    out = []
+    while len(out) < lines:
+        n = len(out)
+        # One brace style per class, as a codebase would have.
+        style = rng.choice(['kr', 'kr', 'broken', 'allman'])
+        out += brace_open(f"{head} Service{n}", '', style)
+        if not java:
+            out.append("public:")
+        out.append("    private int calls = 0;" if java else "    int calls = 0;")
+        for m in range(rng.randint(1, 3)):
+            if rng.random() < 0.3:
+                out += ["", "    /**", f"     * Scores the items against limit ({m}).", "     */"]
+            params = 'int[] items, int n, int limit' if java else 'const std::vector<int>& items, int n, int limit'
+            signature = f"{'public int' if java else 'int'} handle{n}_{m}({params})"
+            out += brace_open(signature, '    ', style) + ["        int total = 0;", "        int x = limit;", "        calls++;"]
+            for _ in range(rng.randint(1, 4)):
+                out += brace_block(rng, 0, java, style)
+            out += ["        return total;", "    }"]
+        out += ["};" if not java else "}", ""]
+    return '\n'.join(out)
+
+
+def make_corpus(seed):
+    rng = random.Random(seed)
+    corpus = []
+    for language in LANGUAGES:
+        for size, lines in SIZES.items():
+            if language == 'python':
+                code = python_source(lines, rng)
+                # A sample that doesn't parse is scored as zero straight
+                # away, which would time a no-op instead of the analyzer.
+                compile(code, f'<{size} python sample>', 'exec')
+            else:
+                code = brace_source(lines, rng, java=language == 'java')
+            corpus.append({'language': language, 'size': size, 'code': code})
+    return corpus
+
+
+# ------------------ HTTP Client ------------------ #
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, form=None, payload=None):
+        headers = {}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif payload is not None:
+            body = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+# ------------------ Workload ------------------ #
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        route = route.strip()
+        if route not in ('analyze', 'history', 'csv', 'pdf'):
+            raise ValueError(f'Unknown route in mix: {route}')
+        mix[route] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route, status, seconds):
+        with self.lock:
+            self.samples[route].append(seconds)
+            self.statuses[route][str(status)] += 1
+
+
+def run_worker(client, corpus, mix, deadline, recorder, rng):
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    # Downloads need a latest result in the session.
+    client.request('POST', '/analyze', payload=dict(rng.choice(corpus), filename='warmup'))
+
+    while time.monotonic() < deadline:
+        route = rng.choices(routes, weights)[0]
+        if route == 'analyze':
+            sample = rng.choice(corpus)
+            name = f"analyze:{sample['language']}:{sample['size']}"
+            args = ('POST', '/analyze')
+            kwargs = {'payload': {'code': sample['code'], 'language': sample['language'],
+                                  'filename': f"load_{sample['size']}"}}
+        elif route == 'history':
+            name, args, kwargs = 'history', ('GET', '/history'), {}
+        else:
+            name, args, kwargs = route, ('GET', f'/download/{route}'), {}
+
+        start = time.perf_counter()
+        try:
+            status = client.request(*args, **kwargs)
+        except (urllib.error.URLError, socket.timeout, ConnectionError):
+            status = 'connection_error'
+        recorder.record(name, status, time.perf_counter() - start)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    total = errors = limited_total = 0
+    for name, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        statuses = dict(recorder.statuses[name])
+        # 429s are the rate limiter doing its job, not server failures.
+        failed = sum(n for s, n in statuses.items()
+                     if not s.isdigit() or (int(s) >= 400 and s != '429'))
+        limited = statuses.get('429', 0)
+        total += len(samples)
+        errors += failed
+        limited_total += limited
+        routes[name] = {
+            'requests': len(samples),
+            'throughput_rps': len(samples) / elapsed,
+            'error_rate': failed / len(samples),
+            'rate_limited': limited / len(samples),
+            'statuses': statuses,
+            'mean_ms': 1000 * sum(samples) / len(samples),
+            'p50_ms': 1000 * percentile(samples, 50),
+            'p95_ms': 1000 * percentile(samples, 95),
+            'p99_ms': 1000 * percentile(samples, 99),
+        }
+    return {
+        'elapsed_s': elapsed,
+        'requests': total,
+        'throughput_rps': total / elapsed if elapsed else 0,
+        'error_rate': errors / total if total else 0,
+        'rate_limited': limited_total / total if total else 0,
+        'routes': routes,
+    }
+
+
+# ------------------ Local Server ------------------ #
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def write_settings(directory, rate_limits):
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'loadtest.db'),
+        'EXPORT_CACHE_DIR': os.path.join(directory, 'export_cache'),
+    }
+    if rate_limits is not None:
+        settings['RATE_LIMITS'] = rate_limits
+    path = os.path.join(directory, 'settings.py')
+    with open(path, 'w') as f:
+        for key, value in settings.items():
+            f.write(f'{key} = {value!r}\n')
+    return path
+
+
+def start_server(command, port, settings):
+    env = dict(os.environ, PORT=str(port), COMPLEXITY_SETTINGS=settings)
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Its own session, so stop_server can signal the shell together with the
+    # server (and any workers) it started.
+    proc = subprocess.Popen(command.format(port=port), shell=True, cwd=cwd, env=env, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'Server exited with code {proc.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    stop_server(proc)
+    raise RuntimeError('Server did not start within 30s')
+
+
+def stop_server(proc, timeout=30):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+def parse_rate_limits(text):
+    # 'off' (the default), 'app' for the app's own RATE_LIMITS, or a JSON
+    # object in the RATE_LIMITS format.
+    if text == 'off':
+        return {'analyze': UNLIMITED, 'pdf': UNLIMITED}
+    if text == 'app':
+        return None
+    return json.loads(text)
+
+
+DEFAULT_SERVER_CMD = (
+    f'"{sys.executable}" -c "from backend.app import create_app, start; app = create_app(); start(app); '
+    'app.run(port={port}, threaded=True)"'
+)
+
+
+# ------------------ Reporting ------------------ #
+def print_report(report):
+    summary = report['summary']
+    print(f"{summary['requests']} requests in {summary['elapsed_s']:.1f}s: "
+          f"{summary['throughput_rps']:.1f} req/s, error rate {summary['error_rate']:.2%}, "
+          f"rate limited {summary['rate_limited']:.2%}")
+    print(f"{'route':<24}{'reqs':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err':>8}{'429':>8}")
+    for name, r in summary['routes'].items():
+        print(f"{name:<24}{r['requests']:>7}{r['throughput_rps']:>9.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['error_rate']:>8.2%}{r['rate_limited']:>8.2%}")
+
+
+def compare(paths):
+    reports = []
+    for path in paths:
+        with open(path) as f:
+            reports.append(json.load(f))
+    print(f"{'route':<24}" + ''.join(f"{os.path.basename(p)[:22]:>24}" for p in paths))
+    print(f"{'throughput req/s':<24}" + ''.join(
+        f"{r['summary']['throughput_rps']:>24.1f}" for r in reports))
+    names = sorted({n for r in reports for n in r['summary']['routes']})
+    for name in names:
+        cells = []
+        for r in reports:
+            route = r['summary']['routes'].get(name)
+            cells.append(f"{route['p50_ms']:.1f}/{route['p99_ms']:.1f} ms" if route else '-')
+        print(f"{name:<24}" + ''.join(f"{c:>24}" for c in cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mixed-workload load test for the complexity service')
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--server-cmd', default=DEFAULT_SERVER_CMD,
+                        help='Command used to start the local server; {port} is substituted')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Route weights, e.g. analyze=6,history=2,csv=1,pdf=1')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--rate-limits', default='off',
+                        help="Limits for a started server: 'off', 'app' (the app's defaults) or RATE_LIMITS as JSON")
+    parser.add_argument('--label', default='', help='Free-form description of the server configuration')
+    parser.add_argument('--output', help='Write the JSON report here')
+    parser.add_argument('--compare', nargs='+', metavar='REPORT', help='Compare saved JSON reports and exit')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(args.compare)
+        return
+
+    mix = parse_mix(args.mix)
+    corpus = make_corpus(args.seed)
+    rate_limits = parse_rate_limits(args.rate_limits)
+    server = workdir = None
+    base_url = args.url
+    try:
+        if not base_url:
+            workdir = tempfile.TemporaryDirectory(prefix='loadtest-')
+            port = free_port()
+            server = start_server(args.server_cmd, port, write_settings(workdir.name, rate_limits))
+            base_url = f'http://127.0.0.1:{port}'
+
+        run_id = uuid.uuid4().hex[:8]
+        users = [(f'loadtest-{run_id}-{n}@example.com', uuid.uuid4().hex) for n in range(args.users)]
+        for email, password in users:
+            Client(base_url, args.timeout).request('POST', '/signup', form={'email': email, 'password': password})
+
+        clients = []
+        for n in range(args.concurrency):
+            email, password = users[n % len(users)]
+            client = Client(base_url, args.timeout)
+            status = client.request('POST', '/login', form={'email': email, 'password': password})
+            if status != 200:
+                raise RuntimeError(f'Login failed for {email}: HTTP {status}')
+            clients.append(client)
+
+        recorder = Recorder()
+        start = time.monotonic()
+        deadline = start + args.duration
+        threads = [
+            threading.Thread(target=run_worker,
+                             args=(client, corpus, mix, deadline, recorder, random.Random(args.seed + n)))
+            for n, client in enumerate(clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - start
+    finally:
+        if server:
+            stop_server(server)
+        if workdir:
+            workdir.cleanup()
+
+    report = {
+        'label': args.label,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(start)),
+        'config': {
+            'url': args.url or 'local',
+            'server_cmd': None if args.url else args.server_cmd,
+            # What a started server ran with; unknown for --url.
+            'database': None if args.url else 'temporary',
+            'rate_limits': None if args.url else (rate_limits or 'app'),
+            'duration_s': args.duration,
+            'concurrency': args.concurrency,
+            'users': args.users,
+            'mix': mix,
+            'seed': args.seed,
+            'sizes': SIZES,
+        },
+        'summary': summarize(recorder, elapsed),
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
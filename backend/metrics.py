@@ -0,0 +1,168 @@
+import math
+import re
+from collections import Counter
+
+# Shared accumulators for the metrics computed alongside DC/CC: cognitive
+# complexity, Halstead volume/effort and physical/logical LOC. The analyzers
+# feed these from the traversal they already do (the ast walk for Python, the
+# line scan for Java/C++), so one parse yields every metric.
+
+C_LIKE_KEYWORDS = {
+    'if', 'else', 'for', 'while', 'do', 'switch', 'case', 'default', 'break', 'continue',
+    'return', 'try', 'catch', 'finally', 'throw', 'throws', 'new', 'delete', 'class', 'struct',
+    'public', 'private', 'protected', 'static', 'final', 'const', 'virtual', 'override',
+    'void', 'int', 'long', 'short', 'char', 'bool', 'boolean', 'float', 'double', 'byte',
+    'auto', 'extends', 'implements', 'import', 'package', 'namespace', 'using', 'template',
+    'typename', 'this', 'super', 'instanceof', 'sizeof', 'goto', 'enum', 'interface',
+    'abstract', 'synchronized', 'volatile', 'inline', 'operator', 'friend', 'typedef',
+}
+
+C_LIKE_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\])*"'                 # string literal
+    r"|'(?:\\.|[^'\\])*'"                # char literal
+    r'|\b\d[\w.]*'                       # numeric literal
+    r'|\b[A-Za-z_]\w*\b'                 # identifier or keyword
+    r'|::|->|\+\+|--|&&|\|\||<<=|>>=|<<|>>|[<>=!+\-*/%&|^]=|[-+*/%=<>!&|^~?:.,;(\[{]'
+)
+
+BOOLEAN_SEQUENCE = re.compile(r'&&|\|\|')
+COGNITIVE_KEYWORD = re.compile(r'\}?\s*(else\s+if|if|for|while|do|switch|catch|else)\b')
+
+
+def c_like_tokens(line):
+    operators = []
+    operands = []
+    for token in C_LIKE_TOKEN.findall(line):
+        if token[0].isalpha() or token[0] == '_':
+            (operators if token in C_LIKE_KEYWORDS else operands).append(token)
+        elif token[0].isdigit() or token[0] in '"\'':
+            operands.append(token)
+        else:
+            operators.append(token)
+    return operators, operands
+
+
+def count_line(counters, operators, operands, logical):
+    for counter in counters:
+        if counter:
+            counter.add_line(operators, operands, logical)
+
+
+def add_cognitive(counters, amount):
+    for counter in counters:
+        if counter:
+            counter.cognitive += amount
+
+
+def c_like_cognitive(stripped):
+    # Line-based cognitive complexity for Java/C++: +1 plus nesting for each
+    # structure that nests, a flat +1 for else/else if, and one per run of
+    # boolean operators. Returns the flat part and whether the line nests, so
+    # the scanners can add 1 + nesting once they know the depth.
+    score = boolean_sequences(stripped)
+    match = COGNITIVE_KEYWORD.match(stripped)
+    if match:
+        keyword = match.group(1)
+        if keyword.startswith('else'):
+            return score + 1, False
+        # `} while (...);` closes a do-while that was already counted.
+        return score, not (keyword == 'while' and stripped.startswith('}') and stripped.endswith(';'))
+    return score, '?' in stripped and ':' in stripped
+
+
+def open_scopes(class_scopes, method_scopes):
+    return [scope.counter for scope in class_scopes + method_scopes]
+
+
+def drop_unopened(scopes, summaries, has_open, logical):
+    # A declaration without `{` on its line only gets a body if the next line
+    # is a lone `{`. Otherwise (abstract/interface methods, forward
+    # declarations, a call the scan took for a declaration) it ends where it
+    # started.
+    while scopes and not scopes[-1].opened and not (has_open and not logical):
+        scope = scopes.pop()
+        summaries[scope.name] = scope.counter.summary(end_line=scope.counter.start_line)
+
+
+def close_scopes(scopes, summaries, depth, has_open, line):
+    # Called after every line with the brace depth after it: a scope opens
+    # once the depth passes the one it was declared at and ends when the
+    # braces balance back to it.
+    while scopes:
+        scope = scopes[-1]
+        if depth > scope.base_depth:
+            scope.opened = True
+            return
+        if not (scope.opened or has_open or depth < scope.base_depth):
+            return
+        scopes.pop()
+        summaries[scope.name] = scope.counter.summary(end_line=line)
+
+
+def end_scopes(scopes, summaries, line):
+    while scopes:
+        scope = scopes.pop()
+        summaries[scope.name] = scope.counter.summary(end_line=line)
+
+
+def boolean_sequences(condition):
+    # Cognitive complexity adds one per run of like boolean operators, so
+    # `a && b && c` is 1 and `a && b || c` is 2.
+    ops = BOOLEAN_SEQUENCE.findall(condition)
+    return sum(1 for i, op in enumerate(ops) if i == 0 or op != ops[i - 1])
+
+
+class MetricCounter:
+    def __init__(self, start_line=None):
+        self.start_line = start_line
+        self.cognitive = 0
+        self.lloc = 0
+        self.operators = Counter()
+        self.operands = Counter()
+
+    def add_line(self, operators, operands, logical):
+        self.operators.update(operators)
+        self.operands.update(operands)
+        self.lloc += logical
+
+    def add_operators(self, tokens):
+        self.operators.update(tokens)
+
+    def add_operands(self, tokens):
+        self.operands.update(tokens)
+
+    def merge(self, other):
+        self.cognitive += other.cognitive
+        self.lloc += other.lloc
+        self.operators.update(other.operators)
+        self.operands.update(other.operands)
+
+    def summary(self, end_line=None, ploc=None):
+        n1, n2 = len(self.operators), len(self.operands)
+        N1, N2 = sum(self.operators.values()), sum(self.operands.values())
+        vocabulary = n1 + n2
+        length = N1 + N2
+        volume = length * math.log2(vocabulary) if vocabulary > 1 else 0
+        difficulty = (n1 / 2) * (N2 / n2) if n2 else 0
+        if ploc is None:
+            ploc = end_line - self.start_line + 1 if end_line and self.start_line else 0
+        return {
+            'cognitive': self.cognitive,
+            'halstead_volume': round(volume, 2),
+            'halstead_effort': round(difficulty * volume, 2),
+            'ploc': ploc,
+            'lloc': self.lloc,
+        }
+
+
+class ScopeMetrics:
+    # Metrics for one method or class body in the Java/C++ line scans. The
+    # DC/CC part of those scans ends a method at its first `}` line; these
+    # counters follow the braces instead, so cognitive nesting and LOC cover
+    # the whole body.
+
+    def __init__(self, name, start_line, base_depth):
+        self.name = name
+        self.base_depth = base_depth
+        self.counter = MetricCounter(start_line)
+        self.opened = False
@@ -0,0 +1,177 @@
+import bisect
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.metrics import MetricCounter
+from backend.python_complexity import analyze_python_code, visit_python_code
+from backend.java_complexity import calculate_java_complexity, scan_java_lines, fold_java_lines
+from backend.cpp_complexity import analyze_cpp_code, scan_cpp_lines, fold_cpp_lines
+
+# Intra-file parallelism for very large submissions, with results identical
+# to a serial run:
+#
+# - Python is split at top-level def/class statements. The visitor's state is
+#   back to empty between top-level statements, so each chunk is analyzed on
+#   its own (parsed with its real line numbers) and the chunks are merged.
+# - Java/C++ scanners carry state from line to line (open methods/classes,
+#   the nesting stack, brace depth), so chunks can't simply be scanned apart.
+#   Instead the per-line work that doesn't depend on that state (tokenizing,
+#   detection regexes, condition weights) runs on chunks in parallel, and the
+#   records are folded in order in this process, which supplies the nesting.
+#
+#   python -m backend.benchmarks parallel --lines 100000 --workers 1,2,4
+
+SERIAL_ANALYZERS = {
+    'python': analyze_python_code,
+    'java': calculate_java_complexity,
+    'c++': analyze_cpp_code,
+}
+LINE_SCANNERS = {
+    'java': (scan_java_lines, fold_java_lines),
+    'c++': (scan_cpp_lines, fold_cpp_lines),
+}
+CHUNKS_PER_WORKER = 2
+PY_DECLARATIONS = ('def ', 'async def ', 'class ', '@')
+
+
+def python_boundaries(lines):
+    # Lines starting a top-level def/class, or the first of its decorators.
+    # A column-0 `def` inside a string or bracket still ends up here; the
+    # chunk before it then fails to parse and the file is analyzed serially.
+    return [i for i, line in enumerate(lines)
+            if i and line.startswith(PY_DECLARATIONS) and not lines[i - 1].startswith('@')]
+
+
+def chunk_starts(line_count, parts, boundaries=None):
+    # 0-based first lines of up to `parts` chunks of similar size, each at
+    # the first boundary past its even share (any line when boundaries is None).
+    starts = [0]
+    for k in range(1, parts):
+        target = line_count * k // parts
+        if boundaries is not None:
+            index = bisect.bisect_left(boundaries, target)
+            if index == len(boundaries):
+                break
+            target = boundaries[index]
+        if target > starts[-1]:
+            starts.append(target)
+    return starts
+
+
+def analyze_chunk(language, text, first_line):
+    if language == 'python':
+        return visit_python_code(text, first_line)
+    scan, _ = LINE_SCANNERS[language]
+    # Interned tokens pickle once per chunk instead of once per occurrence,
+    # which keeps unpickling in the parent (the serial part) cheap.
+    intern = sys.intern
+    return [record[:-2] + (tuple(map(intern, record[-2])), tuple(map(intern, record[-1])))
+            for record in scan(text.split('\n'), first_line)]
+
+
+def merge_structures(structures, part):
+    for kind, info in part.items():
+        merged = structures.setdefault(kind, {
+            'count': 0,
+            'nesting_levels': [],
+            'level_counts': {},
+            'nested_conditions': {}
+        })
+        merged['count'] += info['count']
+        merged['nesting_levels'].extend(info['nesting_levels'])
+        for level, count in info['level_counts'].items():
+            merged['level_counts'][level] = merged['level_counts'].get(level, 0) + count
+        for level, nested in info['nested_conditions'].items():
+            target = merged['nested_conditions'].setdefault(level, {})
+            for parent, count in nested.items():
+                target[parent] = target.get(parent, 0) + count
+
+
+def merge_python(parts, code):
+    total_dc = 0
+    total_cc = 1
+    line_scores = {}
+    methods = {}
+    classes = {}
+    structures = {}
+    file_metrics = MetricCounter(1)
+
+    # Chunks are merged in file order, so later definitions of a name replace
+    # earlier ones exactly as they do within one visit.
+    for part in parts:
+        total_dc += part['total_dc']
+        total_cc += part['total_cc'] - 1
+        line_scores.update(part['line_scores'])
+        methods.update(part['methods'])
+        classes.update(part['classes'])
+        merge_structures(structures, part['structures'])
+        file_metrics.merge(part['file_metrics'])
+
+    return {
+        'total_dc': total_dc,
+        'total_cc': total_cc,
+        'line_scores': line_scores,
+        'methods': methods,
+        'classes': classes,
+        'structures': structures,
+        'metrics': file_metrics.summary(ploc=len(code.splitlines()))
+    }
+
+
+class ParallelAnalyzer:
+    # Splits files of at least min_lines lines across a pool of `workers`
+    # processes, started on first use. Smaller files (or workers < 2) run
+    # serially in the calling thread.
+
+    def __init__(self, workers, min_lines):
+        self.workers = workers
+        self.min_lines = min_lines
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded server process can copy held locks.
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def analyze(self, language, code):
+        lines = code.split('\n')
+        # Python counts a lone '\r' as a line break too, which would shift
+        # the chunks' line numbers.
+        if self.workers < 2 or len(lines) < self.min_lines or \
+                (language == 'python' and '\r' in code.replace('\r\n', '')):
+            return SERIAL_ANALYZERS[language](code)
+
+        boundaries = python_boundaries(lines) if language == 'python' else None
+        starts = chunk_starts(len(lines), self.workers * CHUNKS_PER_WORKER, boundaries)
+        if len(starts) == 1:
+            return SERIAL_ANALYZERS[language](code)
+
+        pool = self._executor()
+        futures = [
+            pool.submit(analyze_chunk, language, '\n'.join(lines[start:end]), start + 1)
+            for start, end in zip(starts, starts[1:] + [len(lines)])
+        ]
+
+        if language == 'python':
+            parts = [future.result() for future in futures]
+            if any(part is None for part in parts):
+                return analyze_python_code(code)
+            return merge_python(parts, code)
+
+        _, fold = LINE_SCANNERS[language]
+        records = []
+        for future in futures:
+            records.extend(future.result())
+        return fold(records, len(lines))
@@ -1,17 +1,65 @@
 import ast
 
+from backend.metrics import MetricCounter
+
+# Halstead bookkeeping: these nodes only group their operator child (ast.Add,
+# ast.And, ...) or carry context, so they are not operators themselves.
+NON_OPERATOR_NODES = (
+    ast.Module, ast.Expr, ast.BinOp, ast.BoolOp, ast.Compare, ast.UnaryOp,
+    ast.expr_context, ast.arguments, ast.Name, ast.Constant, ast.arg,
+)
+
+
+def halstead_tokens(node):
+    operators = []
+    operands = []
+    if isinstance(node, ast.Name):
+        operands.append(node.id)
+    elif isinstance(node, ast.Constant):
+        operands.append(repr(node.value)[:50])
+    elif isinstance(node, ast.arg):
+        operands.append(node.arg)
+    elif isinstance(node, ast.alias):
+        operands.append(node.asname or node.name)
+    elif isinstance(node, ast.Attribute):
+        operators.append('.')
+        operands.append(node.attr)
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        operators.append(type(node).__name__)
+        operands.append(node.name)
+    elif isinstance(node, ast.keyword):
+        operators.append('=')
+        if node.arg:
+            operands.append(node.arg)
+    elif not isinstance(node, NON_OPERATOR_NODES):
+        operators.append(type(node).__name__)
+    return operators, operands
+
+
 def analyze_python_code(code):
-    try:
-        tree = ast.parse(code)
-    except SyntaxError:
+    result = visit_python_code(code)
+    if result is None:
         return {
             'total_dc': 0,
             'total_cc': 0,
             'line_scores': {},
             'methods': {},
             'classes': {},
-            'structures': {}
+            'structures': {},
+            'metrics': {}
         }
+    result['metrics'] = result.pop('file_metrics').summary(ploc=len(code.splitlines()))
+    return result
+
+
+def visit_python_code(code, first_line=1):
+    # The analysis with the file-level metric counter left open, so that the
+    # top-level statements of a large file can be analyzed in chunks (each
+    # starting at first_line) and merged. None when the code doesn't parse.
+    try:
+        tree = ast.parse('\n' * (first_line - 1) + code)
+    except SyntaxError:
+        return None
 
     line_scores = {}
     total_dc = 0
@@ -19,6 +67,7 @@ def analyze_python_code(code):
     methods = {}
     classes = {}
     structures = {}
+    file_metrics = MetricCounter(1)
 
     class CodeAnalyzer(ast.NodeVisitor):
         def __init__(self):
@@ -27,6 +76,50 @@ def analyze_python_code(code):
             self.dc_stack = []
             self.cc_stack = []
             self.depth = 0
+            # Cognitive-complexity nesting and the metric scopes (file, then
+            # enclosing classes/functions) each visited node is counted into.
+            self.cog_depth = 0
+            self.func_depth = 0
+            self.scopes = [file_metrics]
+
+        def visit(self, node):
+            if not isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                self._count_node(node)
+            return super().visit(node)
+
+        def _count_node(self, node):
+            operators, operands = halstead_tokens(node)
+            is_stmt = isinstance(node, ast.stmt)
+            for scope in self.scopes:
+                scope.add_operators(operators)
+                scope.add_operands(operands)
+                if is_stmt:
+                    scope.lloc += 1
+
+        def _add_cognitive(self, amount):
+            for scope in self.scopes:
+                scope.cognitive += amount
+
+        def _visit_nested(self, node, increment=True):
+            if increment:
+                self._add_cognitive(1 + self.cog_depth)
+            self.cog_depth += 1
+            self.generic_visit(node)
+            self.cog_depth -= 1
+
+        def _visit_scope(self, node, is_function):
+            scope = MetricCounter(node.lineno)
+            self.scopes.append(scope)
+            self._count_node(node)
+            saved_depth, saved_func_depth = self.cog_depth, self.func_depth
+            # Functions nested in functions add a nesting level; methods and
+            # top-level functions start from zero.
+            self.cog_depth = saved_depth + 1 if is_function and self.func_depth else 0
+            self.func_depth = saved_func_depth + 1 if is_function else 0
+            self.generic_visit(node)
+            self.cog_depth, self.func_depth = saved_depth, saved_func_depth
+            self.scopes.pop()
+            return scope.summary(end_line=node.end_lineno)
 
         def _register_structure(self, type_name, lineno, test_node=None, body=None, base_weight=1):
             if type_name not in structures:
@@ -100,43 +193,62 @@ def analyze_python_code(code):
             return conds, ops, operands
 
         def visit_FunctionDef(self, node):
+            # Restore the enclosing function afterwards: a nested def would
+            # otherwise leave it None and the outer one is stored under None.
+            enclosing = self.current_func
             self.current_func = node.name
             self.dc_stack.append(0)
             self.cc_stack.append(1)
-            self.generic_visit(node)
-            methods[self.current_func] = {
+            metrics = self._visit_scope(node, is_function=True)
+            methods[node.name] = {
                 'dc': self.dc_stack.pop(),
-                'cc': self.cc_stack.pop()
+                'cc': self.cc_stack.pop(),
+                **metrics
             }
-            self.current_func = None
+            self.current_func = enclosing
 
         def visit_ClassDef(self, node):
+            enclosing = self.current_class
             self.current_class = node.name
             self.dc_stack.append(0)
             self.cc_stack.append(1)
-            self.generic_visit(node)
-            classes[self.current_class] = {
+            metrics = self._visit_scope(node, is_function=False)
+            classes[node.name] = {
                 'dc': self.dc_stack.pop(),
-                'cc': self.cc_stack.pop()
+                'cc': self.cc_stack.pop(),
+                **metrics
             }
-            self.current_class = None
+            self.current_class = enclosing
 
         def visit_If(self, node):
             self.depth += 1
             self._register_structure('if', node.lineno, test_node=node.test, body=node.body, base_weight=2)
-            self.generic_visit(node)
+            # An elif is an If alone in its parent's orelse at the same column;
+            # it costs a flat +1 and shares the parent's nesting.
+            elif_child = None
+            if len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If) \
+                    and node.orelse[0].col_offset == node.col_offset:
+                elif_child = node.orelse[0]
+                elif_child.is_elif = True
+            elif node.orelse:
+                self._add_cognitive(1)
+            if getattr(node, 'is_elif', False):
+                self._add_cognitive(1)
+                self.generic_visit(node)
+            else:
+                self._visit_nested(node)
             self.depth -= 1
 
         def visit_While(self, node):
             self.depth += 1
             self._register_structure('while', node.lineno, test_node=node.test, body=node.body, base_weight=3)
-            self.generic_visit(node)
+            self._visit_nested(node)
             self.depth -= 1
 
         def visit_For(self, node):
             self.depth += 1
             self._register_structure('for', node.lineno, body=node.body, base_weight=2)
-            self.generic_visit(node)
+            self._visit_nested(node)
             self.depth -= 1
 
         def visit_Try(self, node):
@@ -145,13 +257,20 @@ def analyze_python_code(code):
 
         def visit_IfExp(self, node):
             self._register_structure('ternary', node.lineno, test_node=node.test, base_weight=2)
-            self.generic_visit(node)
+            self._visit_nested(node)
+
+        def visit_ExceptHandler(self, node):
+            self._visit_nested(node)
+
+        def visit_Lambda(self, node):
+            self._visit_nested(node, increment=False)
 
         def visit_BoolOp(self, node):
             nonlocal total_cc
             total_cc += len(node.values) - 1
             if self.cc_stack:
                 self.cc_stack[-1] += len(node.values) - 1
+            self._add_cognitive(1)
             self.generic_visit(node)
 
     CodeAnalyzer().visit(tree)
@@ -162,5 +281,6 @@ def analyze_python_code(code):
         'line_scores': line_scores,
         'methods': methods,
         'classes': classes,
-        'structures': structures
+        'structures': structures,
+        'file_metrics': file_metrics
     }
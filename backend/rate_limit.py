@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+
+class TokenBucketLimiter:
+    # In-process token buckets keyed by (user_id, bucket name). Each request is
+    # charged its estimated cost (input lines, PDF pages) rather than 1, so a
+    # single huge upload drains the bucket as fast as many small ones would.
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    # Charges `cost` tokens to `key`. Returns 0 if allowed, otherwise the
+    # number of seconds until enough tokens will have been refilled (inf if
+    # the bucket never refills).
+    def consume(self, key, cost, capacity, refill_rate):
+        needed = admission_cost(cost, capacity)
+        if needed > capacity:
+            return math.inf
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= needed:
+                self._buckets[key] = (tokens - cost, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return refill_wait(needed - tokens, refill_rate)
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class DatabaseTokenBucketLimiter:
+    # Same contract as TokenBucketLimiter, but the buckets live in the
+    # rate_bucket table so every worker process draws from one budget. Refill
+    # and charge happen in a single conditional UPDATE, which is atomic on
+    # SQLite and Postgres without any explicit locking.
+    REFILLED = ('CASE WHEN tokens + (:now - updated) * :rate > :capacity '
+                'THEN :capacity ELSE tokens + (:now - updated) * :rate END')
+
+    def __init__(self, db, clock=time.time):
+        self._db = db
+        self._clock = clock
+
+    def consume(self, key, cost, capacity, refill_rate):
+        params = {
+            'key': ':'.join(str(part) for part in key),
+            'cost': cost,
+            'needed': admission_cost(cost, capacity),
+            'capacity': capacity,
+            'rate': refill_rate,
+            'now': self._clock(),
+        }
+        if params['needed'] > capacity:
+            return math.inf
+        while True:
+            try:
+                with self._db.engine.begin() as conn:
+                    charged = conn.execute(text(
+                        f'UPDATE rate_bucket SET tokens = {self.REFILLED} - :cost, updated = :now '
+                        f'WHERE bucket_key = :key AND {self.REFILLED} >= :needed'
+                    ), params)
+                    if charged.rowcount:
+                        return 0
+                    row = conn.execute(text(
+                        'SELECT tokens, updated FROM rate_bucket WHERE bucket_key = :key'
+                    ), params).first()
+                    if row is None:
+                        conn.execute(text(
+                            'INSERT INTO rate_bucket (bucket_key, tokens, updated) '
+                            'VALUES (:key, :capacity - :cost, :now)'
+                        ), params)
+                        return 0
+            except IntegrityError:
+                # Another worker created the bucket first; charge against it.
+                continue
+            # The UPDATE didn't charge, so this request isn't admitted even if
+            # the refill rounds differently here: it waits at least a token.
+            tokens = min(capacity, row.tokens + (params['now'] - row.updated) * refill_rate)
+            return refill_wait(max(params['needed'] - tokens, 1), refill_rate)
+
+    def reset(self, key=None):
+        with self._db.engine.begin() as conn:
+            if key is None:
+                conn.execute(text('DELETE FROM rate_bucket'))
+            else:
+                conn.execute(text('DELETE FROM rate_bucket WHERE bucket_key = :key'),
+                             {'key': ':'.join(str(part) for part in key)})
+
+
+def admission_cost(cost, capacity):
+    # A request bigger than the whole bucket is admitted once the bucket is
+    # full and then charged its full cost, leaving the bucket in debt, so a
+    # huge upload still costs its size instead of being rejected forever.
+    # An empty bucket (capacity 0) admits nothing.
+    return min(cost, capacity) if capacity > 0 else max(cost, 1)
+
+
+def refill_wait(missing, refill_rate):
+    # A bucket that never refills (a hard quota or a block) never admits the
+    # request again.
+    if refill_rate <= 0:
+        return math.inf
+    return missing / refill_rate
+
+
+def retry_after_header(wait_seconds):
+    # Retry-After only takes whole seconds; round up so a client that waits
+    # exactly that long is guaranteed to be admitted.
+    return str(max(1, math.ceil(wait_seconds)))
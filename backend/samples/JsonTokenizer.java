@@ -0,0 +1,115 @@
+package com.example.json;
+
+import java.util.ArrayList;
+import java.util.List;
+
+/* Splits JSON text into tokens. Strings may contain braces, like "{", which
+ * must not be mistaken for structure. */
+public final class JsonTokenizer {
+    public enum Kind { LBRACE, RBRACE, LBRACKET, RBRACKET, COLON, COMMA, STRING, NUMBER, LITERAL }
+
+    public static final class Token {
+        public final Kind kind;
+        public final String text;
+        public final int offset;
+
+        Token(Kind kind, String text, int offset) {
+            this.kind = kind;
+            this.text = text;
+            this.offset = offset;
+        }
+    }
+
+    private final String input;
+    private int pos;
+
+    public JsonTokenizer(String input) {
+        this.input = input;
+    }
+
+    public List<Token> tokenize() {
+        List<Token> tokens = new ArrayList<>();
+        while (pos < input.length()) {
+            char c = input.charAt(pos);
+            if (Character.isWhitespace(c)) {
+                pos++;
+            } else if (c == '{') {
+                tokens.add(new Token(Kind.LBRACE, "{", pos++));
+            } else if (c == '}') {
+                tokens.add(new Token(Kind.RBRACE, "}", pos++));
+            } else if (c == '[' || c == ']') {
+                tokens.add(new Token(c == '[' ? Kind.LBRACKET : Kind.RBRACKET, String.valueOf(c), pos++));
+            } else if (c == ':') {
+                tokens.add(new Token(Kind.COLON, ":", pos++));
+            } else if (c == ',') {
+                tokens.add(new Token(Kind.COMMA, ",", pos++));
+            } else if (c == '"') {
+                tokens.add(readString());
+            } else if (c == '-' || Character.isDigit(c)) {
+                tokens.add(readNumber());
+            } else if (Character.isLetter(c)) {
+                tokens.add(readLiteral());
+            } else {
+                throw error("Unexpected character '" + c + "'");
+            }
+        }
+        return tokens;
+    }
+
+    private Token readString() {
+        int start = pos++;
+        StringBuilder out = new StringBuilder();
+        boolean escaped = false;
+        while (pos < input.length()) {
+            char c = input.charAt(pos++);
+            if (escaped) {
+                switch (c) {
+                    case 'n': out.append('\n'); break;
+                    case 't': out.append('\t'); break;
+                    case 'u':
+                        if (pos + 4 > input.length()) {
+                            throw error("Truncated unicode escape");
+                        }
+                        out.append((char) Integer.parseInt(input.substring(pos, pos + 4), 16));
+                        pos += 4;
+                        break;
+                    default: out.append(c);
+                }
+                escaped = false;
+            } else if (c == '\\') {
+                escaped = true;
+            } else if (c == '"') {
+                return new Token(Kind.STRING, out.toString(), start);
+            } else {
+                out.append(c);
+            }
+        }
+        throw error("Unterminated string starting at " + start);
+    }
+
+    private Token readNumber() {
+        int start = pos;
+        if (input.charAt(pos) == '-') pos++;
+        while (pos < input.length() && (Character.isDigit(input.charAt(pos))
+                || input.charAt(pos) == '.' || input.charAt(pos) == 'e' || input.charAt(pos) == 'E')) {
+            pos++;
+        }
+        return new Token(Kind.NUMBER, input.substring(start, pos), start);
+    }
+
+    private Token readLiteral() {
+        int start = pos;
+        while (pos < input.length() && Character.isLetter(input.charAt(pos))) {
+            pos++;
+        }
+        String word = input.substring(start, pos);
+        if (!word.equals("true") && !word.equals("false") && !word.equals("null")) {
+            throw error("Unknown literal " + word);
+        }
+        return new Token(Kind.LITERAL, word, start);
+    }
+
+    private IllegalArgumentException error(String message) {
+        return new IllegalArgumentException(message + " at offset " + pos);
+    }
+}
@@ -0,0 +1,130 @@
+package com.example.cache;
+
+import java.util.HashMap;
+import java.util.Map;
+import java.util.function.Function;
+
+/**
+ * A least-recently-used cache with an optional loader for misses.
+ */
+public class LruCache<K, V> {
+    private static final int DEFAULT_CAPACITY = 128;
+
+    private final Map<K, Node<K, V>> index = new HashMap<>();
+    private final Function<K, V> loader;
+    private final int capacity;
+    private Node<K, V> head;
+    private Node<K, V> tail;
+    private long hits;
+    private long misses;
+
+    public LruCache(int capacity, Function<K, V> loader) {
+        if (capacity <= 0) {
+            throw new IllegalArgumentException("capacity must be positive: " + capacity);
+        }
+        this.capacity = capacity;
+        this.loader = loader;
+    }
+
+    public LruCache(Function<K, V> loader) {
+        this(DEFAULT_CAPACITY, loader);
+    }
+
+    public V get(K key) {
+        Node<K, V> node = index.get(key);
+        if (node != null) {
+            hits++;
+            moveToFront(node);
+            return node.value;
+        }
+        misses++;
+        if (loader == null) {
+            return null;
+        }
+        V value;
+        try {
+            value = loader.apply(key);
+        } catch (RuntimeException e) {
+            // A failing loader must not poison the cache.
+            return null;
+        }
+        if (value != null) {
+            put(key, value);
+        }
+        return value;
+    }
+
+    public void put(K key, V value) {
+        Node<K, V> node = index.get(key);
+        if (node != null) {
+            node.value = value;
+            moveToFront(node);
+            return;
+        }
+        node = new Node<>(key, value);
+        index.put(key, node);
+        addFirst(node);
+        while (index.size() > capacity && tail != null) {
+            index.remove(tail.key);
+            unlink(tail);
+        }
+    }
+
+    public boolean remove(K key) {
+        Node<K, V> node = index.remove(key);
+        if (node == null) return false;
+        unlink(node);
+        return true;
+    }
+
+    public double hitRate() {
+        long total = hits + misses;
+        return total == 0 ? 0.0 : (double) hits / total;
+    }
+
+    private void moveToFront(Node<K, V> node) {
+        if (node == head) {
+            return;
+        }
+        unlink(node);
+        addFirst(node);
+    }
+
+    private void addFirst(Node<K, V> node) {
+        node.next = head;
+        node.prev = null;
+        if (head != null) {
+            head.prev = node;
+        }
+        head = node;
+        if (tail == null) {
+            tail = node;
+        }
+    }
+
+    private void unlink(Node<K, V> node) {
+        if (node.prev != null) {
+            node.prev.next = node.next;
+        } else {
+            head = node.next;
+        }
+        if (node.next != null) {
+            node.next.prev = node.prev;
+        } else {
+            tail = node.prev;
+        }
+        node.prev = node.next = null;
+    }
+
+    private static final class Node<K, V> {
+        final K key;
+        V value;
+        Node<K, V> prev;
+        Node<K, V> next;
+
+        Node(K key, V value) {
+            this.key = key;
+            this.value = value;
+        }
+    }
+}
@@ -0,0 +1,109 @@
+package com.example.orders;
+
+import java.math.BigDecimal;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Optional;
+
+public class OrderService
+{
+    private final OrderRepository repository;
+    private final PaymentGateway payments;
+    private final Notifier notifier;
+
+    public OrderService(OrderRepository repository, PaymentGateway payments, Notifier notifier)
+    {
+        this.repository = repository;
+        this.payments = payments;
+        this.notifier = notifier;
+    }
+
+    public Receipt checkout(Cart cart, Customer customer)
+    {
+        if (cart == null || cart.isEmpty())
+        {
+            throw new IllegalStateException("Cannot check out an empty cart");
+        }
+        BigDecimal total = BigDecimal.ZERO;
+        List<String> warnings = new ArrayList<>();
+        for (LineItem item : cart.items())
+        {
+            if (item.quantity() <= 0)
+            {
+                warnings.add("Skipped " + item.sku() + " with quantity " + item.quantity());
+                continue;
+            }
+            BigDecimal price = item.unitPrice().multiply(BigDecimal.valueOf(item.quantity()));
+            if (item.isTaxable() && !customer.isTaxExempt())
+            {
+                price = price.add(price.multiply(customer.region().taxRate()));
+            }
+            total = total.add(price);
+        }
+
+        BigDecimal discount = discountFor(customer, total);
+        total = total.subtract(discount);
+
+        PaymentResult result;
+        try
+        {
+            result = payments.charge(customer.paymentMethod(), total);
+        }
+        catch (GatewayTimeoutException e)
+        {
+            // The charge may still go through; record it for reconciliation.
+            repository.savePending(cart, customer, total);
+            throw new CheckoutException("Payment gateway timed out", e);
+        }
+
+        if (!result.isApproved())
+        {
+            notifier.paymentDeclined(customer, result.reason());
+            return Receipt.declined(result.reason());
+        }
+
+        Order order = repository.save(new Order(customer.id(), cart.items(), total));
+        notifier.orderPlaced(customer, order);
+        return Receipt.approved(order.id(), total, warnings);
+    }
+
+    BigDecimal discountFor(Customer customer, BigDecimal total)
+    {
+        switch (customer.tier())
+        {
+            case GOLD:
+                return total.multiply(new BigDecimal("0.10"));
+            case SILVER:
+                return total.compareTo(new BigDecimal("100")) >= 0
+                        ? total.multiply(new BigDecimal("0.05"))
+                        : BigDecimal.ZERO;
+            default:
+                return BigDecimal.ZERO;
+        }
+    }
+
+    public Optional<Order> cancel(long orderId, Customer customer)
+    {
+        Optional<Order> found = repository.find(orderId);
+        if (!found.isPresent())
+        {
+            return Optional.empty();
+        }
+        Order order = found.get();
+        if (order.customerId() != customer.id()
+                && !customer.isAdmin())
+        {
+            throw new SecurityException("Order " + orderId + " belongs to another customer");
+        }
+        else if (order.isShipped())
+        {
+            return Optional.empty();
+        }
+        else
+        {
+            payments.refund(order.paymentId(), order.total());
+            repository.markCancelled(order);
+        }
+        return Optional.of(order);
+    }
+}
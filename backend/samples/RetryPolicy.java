@@ -0,0 +1,62 @@
+package com.example.net;
+
+import java.io.IOException;
+import java.time.Duration;
+import java.util.concurrent.Callable;
+import java.util.concurrent.ThreadLocalRandom;
+
+public class RetryPolicy {
+    private final int maxAttempts;
+    private final Duration baseDelay;
+    private final Duration maxDelay;
+    private final boolean jitter;
+
+    public RetryPolicy(int maxAttempts, Duration baseDelay, Duration maxDelay, boolean jitter) {
+        this.maxAttempts = maxAttempts;
+        this.baseDelay = baseDelay;
+        this.maxDelay = maxDelay;
+        this.jitter = jitter;
+    }
+
+    public <T> T call(Callable<T> action) throws Exception {
+        Exception last = null;
+        for (int attempt = 1; attempt <= maxAttempts; attempt++) {
+            try {
+                return action.call();
+            } catch (IOException e) {
+                last = e;
+                if (!isRetryable(e) || attempt == maxAttempts) {
+                    break;
+                }
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                throw e;
+            }
+            sleep(delayFor(attempt));
+        }
+        throw last != null ? last : new IllegalStateException("no attempts made");
+    }
+
+    long delayFor(int attempt) {
+        long delay = baseDelay.toMillis() << Math.min(attempt - 1, 20);
+        delay = Math.min(delay, maxDelay.toMillis());
+        if (jitter && delay > 1) {
+            delay = ThreadLocalRandom.current().nextLong(delay / 2, delay + 1);
+        }
+        return delay;
+    }
+
+    boolean isRetryable(IOException e) {
+        String message = e.getMessage();
+        if (message == null) {
+            return true;
+        }
+        // Client errors won't succeed on a retry.
+        return !(message.contains("400") || message.contains("401") || message.contains("403")
+                || message.contains("404"));
+    }
+
+    private static void sleep(long millis) throws InterruptedException {
+        if (millis > 0) Thread.sleep(millis);
+    }
+}
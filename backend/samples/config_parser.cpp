@@ -0,0 +1,84 @@
+#include <fstream>
+#include <map>
+#include <stdexcept>
+#include <string>
+
+/*
+ * INI-style configuration: [sections], key = value pairs, ';' and '#'
+ * comments, and values that may be quoted.
+ */
+class ConfigParser {
+public:
+    void load(const std::string& path) {
+        std::ifstream file(path);
+        if (!file) {
+            throw std::runtime_error("cannot open " + path);
+        }
+        std::string line;
+        std::string section = "default";
+        int number = 0;
+        while (std::getline(file, line)) {
+            ++number;
+            std::string text = strip(line);
+            if (text.empty() || text[0] == ';' || text[0] == '#') {
+                continue;
+            }
+            if (text.front() == '[') {
+                if (text.back() != ']' || text.size() < 3) {
+                    throw std::runtime_error("bad section header on line " + std::to_string(number));
+                }
+                section = text.substr(1, text.size() - 2);
+                continue;
+            }
+            auto eq = text.find('=');
+            if (eq == std::string::npos) {
+                throw std::runtime_error("expected key = value on line " + std::to_string(number));
+            }
+            std::string key = strip(text.substr(0, eq));
+            std::string value = strip(text.substr(eq + 1));
+            if (value.size() >= 2 && (value.front() == '"' || value.front() == '\'')
+                && value.back() == value.front()) {
+                value = value.substr(1, value.size() - 2);
+            }
+            values_[section + "." + key] = value;
+        }
+    }
+
+    std::string get(const std::string& key, const std::string& fallback = "") const {
+        auto it = values_.find(key);
+        return it == values_.end() ? fallback : it->second;
+    }
+
+    int get_int(const std::string& key, int fallback) const {
+        auto it = values_.find(key);
+        if (it == values_.end()) {
+            return fallback;
+        }
+        try {
+            return std::stoi(it->second);
+        } catch (const std::exception&) {
+            throw std::runtime_error("not an integer: " + key);
+        }
+    }
+
+    bool get_bool(const std::string& key, bool fallback) const {
+        const std::string value = get(key);
+        if (value == "true" || value == "yes" || value == "on" || value == "1") {
+            return true;
+        } else if (value == "false" || value == "no" || value == "off" || value == "0") {
+            return false;
+        }
+        return fallback;
+    }
+
+private:
+    static std::string strip(const std::string& s) {
+        const char* space = " \t\r\n";
+        auto start = s.find_first_not_of(space);
+        if (start == std::string::npos) return "";
+        auto end = s.find_last_not_of(space);
+        return s.substr(start, end - start + 1);
+    }
+
+    std::map<std::string, std::string> values_;
+};
@@ -0,0 +1,107 @@
+#include <algorithm>
+#include <limits>
+#include <queue>
+#include <stdexcept>
+#include <vector>
+
+namespace graph {
+
+struct Edge {
+    int to;
+    long long weight;
+};
+
+class Graph {
+public:
+    explicit Graph(int nodes) : adjacency_(nodes) {}
+
+    void add_edge(int from, int to, long long weight) {
+        if (from < 0 || to < 0 || from >= size() || to >= size()) {
+            throw std::out_of_range("node out of range");
+        }
+        if (weight < 0) {
+            throw std::invalid_argument("negative weights are not supported");
+        }
+        adjacency_[from].push_back({to, weight});
+    }
+
+    int size() const { return static_cast<int>(adjacency_.size()); }
+
+    // Dijkstra with a binary heap; unreachable nodes stay at max().
+    std::vector<long long> shortest_paths(int source) const {
+        const long long unreachable = std::numeric_limits<long long>::max();
+        std::vector<long long> dist(size(), unreachable);
+        using Entry = std::pair<long long, int>;
+        std::priority_queue<Entry, std::vector<Entry>, std::greater<Entry>> queue;
+        dist[source] = 0;
+        queue.push({0, source});
+        while (!queue.empty()) {
+            auto [d, node] = queue.top();
+            queue.pop();
+            if (d > dist[node]) {
+                continue;
+            }
+            for (const Edge& edge : adjacency_[node]) {
+                const long long candidate = d + edge.weight;
+                if (candidate < dist[edge.to]) {
+                    dist[edge.to] = candidate;
+                    queue.push({candidate, edge.to});
+                }
+            }
+        }
+        return dist;
+    }
+
+    // Kahn's algorithm; returns an empty order when there is a cycle.
+    std::vector<int> topological_order() const {
+        std::vector<int> indegree(size(), 0);
+        for (const auto& edges : adjacency_) {
+            for (const Edge& edge : edges) {
+                ++indegree[edge.to];
+            }
+        }
+        std::queue<int> ready;
+        for (int node = 0; node < size(); ++node) {
+            if (indegree[node] == 0) ready.push(node);
+        }
+        std::vector<int> order;
+        while (!ready.empty()) {
+            int node = ready.front();
+            ready.pop();
+            order.push_back(node);
+            for (const Edge& edge : adjacency_[node]) {
+                if (--indegree[edge.to] == 0) {
+                    ready.push(edge.to);
+                }
+            }
+        }
+        if (static_cast<int>(order.size()) != size()) {
+            order.clear();
+        }
+        return order;
+    }
+
+    bool has_path(int from, int to) const {
+        std::vector<bool> seen(size(), false);
+        std::vector<int> stack{from};
+        while (!stack.empty()) {
+            int node = stack.back();
+            stack.pop_back();
+            if (node == to) {
+                return true;
+            } else if (seen[node]) {
+                continue;
+            }
+            seen[node] = true;
+            for (const Edge& edge : adjacency_[node]) {
+                if (!seen[edge.to]) stack.push_back(edge.to);
+            }
+        }
+        return false;
+    }
+
+private:
+    std::vector<std::vector<Edge>> adjacency_;
+};
+
+}  // namespace graph
@@ -0,0 +1,110 @@
+#include <cctype>
+#include <map>
+#include <sstream>
+#include <stdexcept>
+#include <string>
+
+struct Request {
+    std::string method;
+    std::string path;
+    std::string version;
+    std::map<std::string, std::string> headers;
+    std::string body;
+};
+
+static std::string trim(const std::string& s)
+{
+    std::size_t start = 0;
+    std::size_t end = s.size();
+    while (start < end && std::isspace(static_cast<unsigned char>(s[start])))
+    {
+        ++start;
+    }
+    while (end > start && std::isspace(static_cast<unsigned char>(s[end - 1])))
+    {
+        --end;
+    }
+    return s.substr(start, end - start);
+}
+
+static std::string lower(std::string s)
+{
+    for (char& c : s)
+    {
+        c = static_cast<char>(std::tolower(static_cast<unsigned char>(c)));
+    }
+    return s;
+}
+
+Request parse_request(const std::string& raw, std::size_t max_body)
+{
+    Request req;
+    std::istringstream in(raw);
+    std::string line;
+    if (!std::getline(in, line))
+    {
+        throw std::runtime_error("empty request");
+    }
+    std::istringstream start(line);
+    if (!(start >> req.method >> req.path >> req.version))
+    {
+        throw std::runtime_error("malformed request line");
+    }
+    if (req.version != "HTTP/1.1" && req.version != "HTTP/1.0")
+    {
+        throw std::runtime_error("unsupported version " + req.version);
+    }
+
+    while (std::getline(in, line))
+    {
+        if (!line.empty() && line.back() == '\r')
+        {
+            line.pop_back();
+        }
+        if (line.empty())
+        {
+            break;
+        }
+        const auto colon = line.find(':');
+        if (colon == std::string::npos)
+        {
+            throw std::runtime_error("malformed header: " + line);
+        }
+        req.headers[lower(trim(line.substr(0, colon)))] = trim(line.substr(colon + 1));
+    }
+
+    auto length = req.headers.find("content-length");
+    if (length != req.headers.end())
+    {
+        std::size_t size = 0;
+        try
+        {
+            size = std::stoul(length->second);
+        }
+        catch (const std::exception&)
+        {
+            throw std::runtime_error("bad content-length");
+        }
+        if (size > max_body)
+        {
+            throw std::length_error("body too large");
+        }
+        req.body.resize(size);
+        in.read(&req.body[0], static_cast<std::streamsize>(size));
+    }
+    else if (req.method == "POST" || req.method == "PUT")
+    {
+        throw std::runtime_error("length required");
+    }
+    return req;
+}
+
+int status_for(const std::exception& e)
+{
+    if (dynamic_cast<const std::length_error*>(&e) != nullptr)
+    {
+        return 413;
+    }
+    const std::string what = e.what();
+    return what == "length required" ? 411 : 400;
+}
@@ -0,0 +1,64 @@
+#include <cstddef>
+#include <list>
+#include <optional>
+#include <stdexcept>
+#include <unordered_map>
+#include <utility>
+
+// A least-recently-used cache: a list in recency order plus an index into it.
+template <typename K, typename V>
+class LruCache {
+public:
+    explicit LruCache(std::size_t capacity) : capacity_(capacity) {
+        if (capacity == 0) {
+            throw std::invalid_argument("capacity must be positive");
+        }
+    }
+
+    std::optional<V> get(const K& key) {
+        auto it = index_.find(key);
+        if (it == index_.end()) {
+            ++misses_;
+            return std::nullopt;
+        }
+        ++hits_;
+        items_.splice(items_.begin(), items_, it->second);
+        return it->second->second;
+    }
+
+    void put(const K& key, V value) {
+        auto it = index_.find(key);
+        if (it != index_.end()) {
+            it->second->second = std::move(value);
+            items_.splice(items_.begin(), items_, it->second);
+            return;
+        }
+        items_.emplace_front(key, std::move(value));
+        index_[key] = items_.begin();
+        while (items_.size() > capacity_) {
+            index_.erase(items_.back().first);
+            items_.pop_back();
+        }
+    }
+
+    bool erase(const K& key) {
+        auto it = index_.find(key);
+        if (it == index_.end()) return false;
+        items_.erase(it->second);
+        index_.erase(it);
+        return true;
+    }
+
+    double hit_rate() const {
+        const auto total = hits_ + misses_;
+        return total == 0 ? 0.0 : static_cast<double>(hits_) / total;
+    }
+
+private:
+    using Item = std::pair<K, V>;
+    std::size_t capacity_;
+    std::list<Item> items_;
+    std::unordered_map<K, typename std::list<Item>::iterator> index_;
+    std::size_t hits_ = 0;
+    std::size_t misses_ = 0;
+};
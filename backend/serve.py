@@ -0,0 +1,67 @@
+import argparse
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from backend.app import create_app, start
+from backend.database import db
+
+# Production entry point: a gunicorn master forking several worker processes,
+# each of which builds its own app (and so its own connection pool) through
+# create_app after the fork.
+#
+#   python -m backend.serve --workers 4 --bind 0.0.0.0:8000
+
+
+class ComplexityServer(BaseApplication):
+    def __init__(self, options, app_config):
+        self.options = options
+        self.app_config = app_config
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return create_app(self.app_config)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the complexity API with multiple worker processes')
+    parser.add_argument('--bind', default=f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count())))
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--timeout', type=int, default=120)
+    args = parser.parse_args(argv)
+
+    # Buckets must be shared once there is more than one process, and the
+    # CPUs are shared out between the workers' intra-file analysis pools.
+    # A worker can't see another's write-behind queue, so /analyze waits
+    # for its group commit before answering.
+    app_config = {'PARALLEL_WORKERS': max(1, multiprocessing.cpu_count() // args.workers)}
+    if args.workers > 1:
+        app_config['RATE_LIMIT_STORAGE'] = 'database'
+        app_config['WRITE_SYNC_COMMIT'] = True
+
+    # Create tables and switch the file to WAL once, in the master, so workers
+    # don't race each other through create_all on startup. The master serves
+    # no requests, so it starts no write-behind thread either.
+    master_app = create_app(dict(app_config, WRITE_BEHIND=False))
+    start(master_app)
+    with master_app.app_context():
+        db.engine.dispose()
+
+    ComplexityServer({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'preload_app': False,
+    }, app_config).run()
+
+
+if __name__ == '__main__':
+    main()
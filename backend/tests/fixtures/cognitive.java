@@ -0,0 +1,51 @@
+class Sample {
+    int twoIfs(int a) {
+        if (a > 0) {
+            a++;
+        }
+        if (a > 1) {
+            a--;
+        }
+        return a;
+    }
+
+    int sumOfPrimes(int max) {
+        int total = 0;
+        for (int i = 1; i <= max; ++i) {
+            boolean prime = true;
+            for (int j = 2; j < i; ++j) {
+                if (i % j == 0) {
+                    prime = false;
+                }
+            }
+            if (prime) {
+                total += i;
+            }
+        }
+        return total;
+    }
+
+    String getWords(int number) {
+        switch (number) {
+            case 1:
+                return "one";
+            case 2:
+                return "a couple";
+            default:
+                return "lots";
+        }
+    }
+
+    int classify(int a, int b) {
+        if (a > 0 && b > 0) {
+            return 1;
+        } else if (a < 0 || b < 0) {
+            return -1;
+        } else {
+            while (a < b) {
+                a++;
+            }
+        }
+        return 0;
+    }
+}
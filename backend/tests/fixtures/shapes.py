@@ -0,0 +1,84 @@
+import functools
+
+USAGE = """
+Paste a function such as
+
+def example(items):
+    return [item for item in items if item]
+
+and submit it for analysis.
+"""
+
+
+def retry(times):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(times):
+                try:
+                    return func(*args, **kwargs)
+                except OSError:
+                    if attempt == times - 1:
+                        raise
+        return wrapper
+    return decorate
+
+
+@retry(3)
+def read_config(path, defaults=None):
+    values = dict(defaults or {})
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            key, _, value = line.partition('=')
+            if key and value:
+                values[key.strip()] = value.strip()
+            elif key:
+                values[key.strip()] = None
+    return values
+
+
+class Inventory:
+    def __init__(self):
+        self.items = {}
+
+    @property
+    def total(self):
+        return sum(count for count in self.items.values() if count > 0)
+
+    @staticmethod
+    def parse(text):
+        name, _, count = text.partition(':')
+        return name, int(count) if count.isdigit() else 0
+
+    def add(self, name, count=1):
+        if count <= 0 and name not in self.items:
+            return False
+        self.items[name] = self.items.get(name, 0) + count
+        while self.items[name] > 1000:
+            self.items[name] -= 1000
+        return True
+
+
+async def drain(queue, handle):
+    done = 0
+    while not queue.empty():
+        item = await queue.get()
+        if item is None or (done > 100 and not handle):
+            break
+        await handle(item)
+        done += 1
+    return done
+
+
+def classify(value):
+    if isinstance(value, bool):
+        return 'flag'
+    elif isinstance(value, int) and value < 0:
+        return 'negative'
+    elif isinstance(value, (int, float)):
+        return 'number'
+    else:
+        return 'other'
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from backend.cpp_complexity import analyze_cpp_code
+from backend.java_complexity import calculate_java_complexity
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Cognitive complexity worked out by hand with the SonarSource rules:
+# +1 per if/for/while/switch/catch plus its nesting inside the method body,
+# a flat +1 for else/else if and one per run of like boolean operators.
+#
+#   twoIfs       if +1, if +1                                     = 2
+#   sumOfPrimes  for +1, for +2, if +3, if +2                     = 8
+#   getWords     switch +1                                        = 1
+#   classify     if +1, && +1, else if +1, || +1, else +1,
+#                while +2                                         = 7
+EXPECTED_METHODS = {'twoIfs': 2, 'sumOfPrimes': 8, 'getWords': 1, 'classify': 7}
+EXPECTED_FILE = 18
+EXPECTED_PLOC = {'twoIfs': 9, 'sumOfPrimes': 15, 'getWords': 10, 'classify': 12}
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('name, analyze', [
+    ('cognitive.java', calculate_java_complexity),
+    ('cognitive.cpp', analyze_cpp_code),
+])
+def test_cognitive_matches_sonar(name, analyze):
+    result = analyze(read_fixture(name))
+
+    assert {method: info['cognitive'] for method, info in result['methods'].items()} == EXPECTED_METHODS
+    assert result['classes']['Sample']['cognitive'] == EXPECTED_FILE
+    assert result['metrics']['cognitive'] == EXPECTED_FILE
+
+
+@pytest.mark.parametrize('name, analyze', [
+    ('cognitive.java', calculate_java_complexity),
+    ('cognitive.cpp', analyze_cpp_code),
+])
+def test_method_metrics_cover_the_whole_body(name, analyze):
+    result = analyze(read_fixture(name))
+
+    # Each method runs from its declaration to the `}` that balances it, not
+    # to the first `}` inside it.
+    assert {method: info['ploc'] for method, info in result['methods'].items()} == EXPECTED_PLOC
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from backend.app import run_analysis
+from backend.loadtest import make_corpus
+from backend.parallel_analysis import SERIAL_ANALYZERS, ParallelAnalyzer, python_boundaries
+
+TESTS = os.path.dirname(__file__)
+SAMPLES = os.path.join(os.path.dirname(TESTS), 'samples')
+FIXTURES = os.path.join(TESTS, 'fixtures')
+LANGUAGES = {'.py': 'python', '.java': 'java', '.cpp': 'c++'}
+
+# DC/CC of each file as computed by the single-pass scanners that preceded
+# the scan/fold split; splitting the scanners must not move them.
+EXPECTED_TOTALS = {
+    'JsonTokenizer.java': (217, 15),
+    'LruCache.java': (135, 14),
+    'OrderService.java': (72, 12),
+    'RetryPolicy.java': (74, 7),
+    'config_parser.cpp': (145, 12),
+    'graph.cpp': (288, 19),
+    'http_request.cpp': (301, 17),
+    'lru_cache.cpp': (67, 7),
+    'cognitive.cpp': (129, 12),
+    'cognitive.java': (129, 12),
+    'shapes.py': (228, 8),
+}
+
+STRING_DEF = '''\
+def first(a):
+    if a and a > 1:
+        return a
+    return 0
+
+
+HELP = """
+def fake(b):
+    if b:
+        return b
+"""
+
+
+def second(c):
+    while c > 0:
+        c -= 1
+    return c
+'''
+
+
+def read_source(name):
+    directory = FIXTURES if name in os.listdir(FIXTURES) else SAMPLES
+    with open(os.path.join(directory, name), newline='') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    analyzer = ParallelAnalyzer(workers=2, min_lines=1)
+    yield analyzer
+    analyzer.shutdown()
+
+
+def assert_same_as_serial(analyzer, language, code):
+    assert repr(analyzer.analyze(language, code)) == repr(SERIAL_ANALYZERS[language](code))
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_TOTALS))
+def test_scanner_totals_unchanged(name, analyzer):
+    language = LANGUAGES[os.path.splitext(name)[1]]
+    code = read_source(name)
+
+    for result in (run_analysis(language, code), run_analysis(language, code, parallel=analyzer)):
+        assert (result['dc'], result['cc']) == EXPECTED_TOTALS[name]
+
+
+@pytest.mark.parametrize('sample', make_corpus(0), ids=lambda s: f"{s['language']}-{s['size']}")
+def test_parallel_matches_serial_on_corpus(sample, analyzer):
+    assert_same_as_serial(analyzer, sample['language'], sample['code'])
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_TOTALS))
+def test_parallel_matches_serial_on_hand_written_code(name, analyzer):
+    assert_same_as_serial(analyzer, LANGUAGES[os.path.splitext(name)[1]], read_source(name))
+
+
+def test_chunks_start_at_decorators():
+    lines = read_source('shapes.py').split('\n')
+
+    for start in python_boundaries(lines):
+        assert not lines[start - 1].startswith('@')
+    assert lines.index('@retry(3)') in python_boundaries(lines)
+    assert lines.index('def read_config(path, defaults=None):') not in python_boundaries(lines)
+
+
+def test_def_inside_a_string(analyzer):
+    # The column-0 `def` in HELP is taken for a boundary; the chunk ending
+    # there doesn't parse and the file is analyzed serially instead.
+    lines = STRING_DEF.split('\n')
+    assert lines.index('def fake(b):') in python_boundaries(lines)
+
+    assert_same_as_serial(analyzer, 'python', STRING_DEF)
+    assert 'fake' not in analyzer.analyze('python', STRING_DEF)['methods']
+
+
+@pytest.mark.parametrize('name', ['shapes.py', 'LruCache.java', 'graph.cpp'])
+def test_lone_carriage_returns(name, analyzer):
+    code = read_source(name).replace('\n', '\r', 5)
+
+    assert_same_as_serial(analyzer, LANGUAGES[os.path.splitext(name)[1]], code)
@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from backend.app import create_app, start
+from backend.database import db
+from backend.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/test.db',
+        'EXPORT_CACHE_DIR': str(tmp_path / 'export_cache'),
+        'WRITE_BEHIND': False,
+    })
+    start(app)
+    with app.app_context():
+        db.session.execute(text('CREATE TABLE note (id INTEGER PRIMARY KEY, value TEXT NOT NULL)'))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def errors():
+    return []
+
+
+@pytest.fixture
+def make_queue(app, errors):
+    queues = []
+
+    def add_notes(items):
+        for value in items:
+            db.session.execute(text('INSERT INTO note (value) VALUES (:value)'), {'value': value})
+
+    def make(**kwargs):
+        # A None item violates NOT NULL, so it can't be stored.
+        queue = WriteBehindQueue(app, add_notes, lambda item, error: errors.append(item), **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def stored(app):
+    with app.app_context():
+        return [row[0] for row in db.session.execute(text('SELECT value FROM note ORDER BY id'))]
+
+
+def test_pending_until_committed(app, make_queue):
+    queue = make_queue(flush_interval=60)
+    first = queue.submit(1, 'a')
+    queue.submit(2, 'b')
+    last = queue.submit(1, 'c')
+
+    assert queue.pending(1) == [(first, 'a'), (last, 'c')]
+    assert stored(app) == []
+
+    # Waiting doesn't sit out the flush interval, and commits what came before.
+    assert queue.wait(last)
+    assert queue.pending(1) == queue.pending(2) == []
+    assert stored(app) == ['a', 'b', 'c']
+
+
+def test_settle_waits_for_the_owner(app, make_queue):
+    queue = make_queue(flush_interval=60)
+    queue.submit(1, 'a')
+    queue.submit(1, 'b')
+    queue.settle(1)
+    queue.settle(2)
+
+    assert queue.pending(1) == []
+    assert stored(app) == ['a', 'b']
+
+
+def test_tracked_failure_reported_once(app, make_queue, errors):
+    queue = make_queue(flush_interval=60)
+    good = queue.submit(1, 'a', track=True)
+    bad = queue.submit(1, None, track=True)
+    after = queue.submit(1, 'b', track=True)
+
+    assert queue.wait(after)
+    assert queue.wait(good)
+    assert not queue.wait(bad)
+    assert queue.wait(bad)
+    # One bad row doesn't take the rest of its batch with it.
+    assert stored(app) == ['a', 'b']
+    assert errors == [None]
+
+
+def test_untracked_failures_are_not_kept(make_queue, errors):
+    queue = make_queue()
+    seqs = [queue.submit(1, None) for _ in range(20)]
+    queue.close()
+
+    assert len(errors) == 20
+    assert queue._failed == queue._tracked == set()
+    assert queue.wait(seqs[-1])
+
+
+def test_submit_blocks_while_the_queue_is_full(make_queue):
+    queue = make_queue(flush_interval=60, max_pending=1)
+    first = queue.submit(1, 'a')
+    blocked = threading.Thread(target=queue.submit, args=(1, 'b'))
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive()
+
+    queue.wait(first)
+    blocked.join(timeout=5)
+    assert not blocked.is_alive()
+
+
+def test_close_drains_the_queue(app, make_queue):
+    queue = make_queue(flush_interval=60)
+    queue.submit(1, 'a')
+    queue.submit(2, 'b')
+    queue.close()
+
+    assert stored(app) == ['a', 'b']
+    with pytest.raises(RuntimeError):
+        queue.submit(1, 'c')
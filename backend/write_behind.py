@@ -0,0 +1,208 @@
+import atexit
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from backend.database import db
+
+# Write-behind persistence for analysis results. Request threads queue their
+# rows and answer straight away; one background thread per process applies
+# the queue in batches, one transaction (and so one fsync and one trip
+# through SQLite's write lock) per batch instead of per request.
+#
+#   python -m backend.benchmarks writes --threads 8 --seconds 10
+
+
+class WriteBehindQueue:
+    # `apply(items)` adds a list of queued items' rows to db.session; it runs
+    # on the writer thread inside an app context and should only execute SQL,
+    # since anything CPU-bound there competes with request threads for the
+    # GIL. Items are committed at most `flush_interval` seconds after they
+    # were queued, or sooner once `max_batch` are waiting or someone waits
+    # for them. submit() blocks while `max_pending` are queued.
+    #
+    # An item stays visible through pending() until its batch is committed,
+    # so readers that look at pending() before the database never miss it.
+    # An item that can't be stored is passed to `on_error(item, error)`,
+    # whose rows are committed in its place. Only items submitted with
+    # track=True remember that until their wait(); the rest would pile up,
+    # since in the default mode nobody waits for them.
+
+    def __init__(self, app, apply, on_error=None, flush_interval=0.05, max_batch=200, max_pending=1000):
+        self.app = app
+        self.apply = apply
+        self.on_error = on_error
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._items = []  # (seq, owner, item, queued_at)
+        self._inflight = []  # the batch being committed
+        self._last_seq = 0
+        self._committed_seq = 0
+        self._tracked = set()  # seqs submitted with track=True, until waited for
+        self._failed = set()  # tracked seqs on_error stood in for
+        self._urgent = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, owner, item, track=False):
+        # With track=True the caller must wait() for the returned seq, which
+        # then says whether the item was stored.
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._items) < self.max_pending or self._closed)
+            if self._closed:
+                raise RuntimeError('Write-behind queue is closed')
+            self._last_seq += 1
+            self._items.append((self._last_seq, owner, item, time.monotonic()))
+            if track:
+                self._tracked.add(self._last_seq)
+            self._cond.notify_all()
+            return self._last_seq
+
+    def pending(self, owner):
+        # (seq, item) for each of `owner`'s items not committed yet, oldest first.
+        with self._cond:
+            return [(seq, item) for seq, item_owner, item, _ in self._inflight + self._items
+                    if item_owner == owner]
+
+    def wait(self, seq):
+        # Block until the item numbered `seq` (and everything before it) is
+        # committed, asking the writer not to wait out the flush interval.
+        # False if the item was submitted with track=True and could not be
+        # stored.
+        with self._cond:
+            if self._committed_seq < seq:
+                self._urgent = True
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._committed_seq >= seq)
+            self._tracked.discard(seq)
+            if seq in self._failed:
+                self._failed.discard(seq)
+                return False
+            return True
+
+    def settle(self, owner):
+        # Wait for all of `owner`'s queued items, e.g. before changing them.
+        pending = self.pending(owner)
+        if pending:
+            self.wait(pending[-1][0])
+
+    def close(self):
+        # Drain whatever is queued, then stop the writer.
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _next_batch(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed)
+            if not self._items:
+                return None
+            deadline = self._items[0][3] + self.flush_interval
+            self._cond.wait_for(
+                lambda: self._urgent or self._closed or len(self._items) >= self.max_batch,
+                timeout=max(0, deadline - time.monotonic()))
+            self._inflight = self._items[:self.max_batch]
+            del self._items[:self.max_batch]
+            if not self._items:
+                self._urgent = False
+            self._cond.notify_all()
+            return self._inflight
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            with self.app.app_context():
+                failed = self._commit(batch)
+            with self._cond:
+                self._inflight = []
+                self._committed_seq = batch[-1][0]
+                self._failed.update(seq for seq in failed if seq in self._tracked)
+                self._cond.notify_all()
+
+    def _commit(self, batch):
+        # Returns the seqs of items that could not be stored.
+        try:
+            self.apply([item for _, _, item, _ in batch])
+            db.session.commit()
+            return []
+        except Exception:
+            db.session.rollback()
+        # Something in the batch failed; commit the items one by one so a
+        # single bad row doesn't take the others with it.
+        failed = []
+        for seq, _, item, _ in batch:
+            try:
+                self.apply([item])
+                db.session.commit()
+                continue
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.exception('Could not store a queued write')
+                error = e
+            failed.append(seq)
+            if self.on_error:
+                try:
+                    self.on_error(item, error)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Could not record a failed write')
+        return failed
+
+
+class IdAllocator:
+    # Primary keys for rows that are queued but not inserted yet. Each process
+    # reserves ranges of `block` ids in the id_block table, so ids handed out
+    # by different workers never collide.
+
+    def __init__(self, db, table, block=100):
+        self._db = db
+        self._table = table
+        self._block = block
+        self._lock = threading.Lock()
+        self._next = self._end = 0
+
+    def next_id(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._reserve()
+                self._end = self._next + self._block
+            self._next += 1
+            return self._next - 1
+
+    def _reserve(self):
+        params = {'name': self._table, 'count': self._block}
+        for _ in range(2):
+            try:
+                with self._db.engine.begin() as conn:
+                    # Never hand out ids at or below a row inserted without
+                    # the allocator (e.g. while write-behind was turned off).
+                    reserved = conn.execute(text(
+                        f'UPDATE id_block SET next_id = CASE '
+                        f'WHEN next_id > (SELECT COALESCE(MAX(id), 0) FROM {self._table}) THEN next_id '
+                        f'ELSE (SELECT COALESCE(MAX(id), 0) + 1 FROM {self._table}) END + :count '
+                        f'WHERE name = :name'
+                    ), params)
+                    if reserved.rowcount:
+                        return conn.execute(text(
+                            'SELECT next_id FROM id_block WHERE name = :name'
+                        ), params).scalar() - self._block
+                    # First reservation: continue after the rows already there.
+                    first = (conn.execute(text(f'SELECT MAX(id) FROM {self._table}')).scalar() or 0) + 1
+                    conn.execute(text(
+                        'INSERT INTO id_block (name, next_id) VALUES (:name, :next_id)'
+                    ), dict(params, next_id=first + self._block))
+                    return first
+            except IntegrityError:
+                # Another worker made the first reservation; take the next range.
+                continue
+        raise RuntimeError(f'Could not reserve ids for {self._table}')